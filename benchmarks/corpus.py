@@ -0,0 +1,172 @@
+import argparse
+import random
+import sys
+
+SEGMENTED_HASH = 'segmented_hash'
+SEGMENTED_MODULARHASH = 'segmented_modularhash'
+UNSEGMENTED = 'unsegmented'
+LAP = 'lap'
+TOPK = 'topk'
+KINDS = (SEGMENTED_HASH, SEGMENTED_MODULARHASH, UNSEGMENTED, LAP, TOPK)
+
+# Relative frequency of each kind in a generated catalog
+DEFAULT_KIND_WEIGHTS = {
+    SEGMENTED_HASH: 60,
+    SEGMENTED_MODULARHASH: 10,
+    UNSEGMENTED: 20,
+    LAP: 5,
+    TOPK: 5,
+}
+
+ENCODINGS = ('AUTO', 'RLE', 'DELTAVAL', 'DELTARANGE_COMP', 'COMMONDELTA_COMP', 'GCDDELTA', 'BLOCK_DICT', 'ZSTD_COMP')
+CREATE_TYPES = ('L', 'P', 'D', 'A')
+SCHEMAS = ('public', 'store', 'online_sales', 'staging')
+AGG_FUNCS = ('sum', 'count', 'min', 'max')
+
+
+def wide_projection(width, sort_every=3):
+    columns = ',\n'.join(' c{0} ENCODING RLE'.format(i) for i in range(width))
+    select = ',\n'.join('        t.c{0}'.format(i) for i in range(width))
+    order_by = ', '.join('t.c{0}'.format(i) for i in range(0, width, sort_every))
+    return (
+        'CREATE PROJECTION public.wide_b0 /*+createtype(L)*/\n(\n{0}\n)\nAS\n SELECT {1}\n FROM public.t\n'
+        ' ORDER BY {2}\nSEGMENTED BY hash(t.c0) ALL NODES KSAFE 1 OFFSET 0;'
+    ).format(columns, select, order_by)
+
+
+class CorpusGenerator():
+    def __init__(self, seed=0, min_width=3, max_width=60, wide_every=200, wide_width=1500, kind_weights=None):
+        self.random = random.Random(seed)
+        self.min_width = min_width
+        self.max_width = max_width
+        self.wide_every = wide_every
+        self.wide_width = wide_width
+        kind_weights = kind_weights or DEFAULT_KIND_WEIGHTS
+        self.kinds = list(kind_weights)
+        self.weights = [kind_weights[k] for k in self.kinds]
+
+    def generate(self, count):
+        index = 0
+        while index < count:
+            kind = self.random.choices(self.kinds, self.weights)[0]
+            width = self.column_count(index)
+            table = 'fact_{0}'.format(index)
+            schema = self.random.choice(SCHEMAS)
+            columns = ['col_{0}'.format(i) for i in range(width)]
+            if kind in (SEGMENTED_HASH, SEGMENTED_MODULARHASH):
+                # Segmented projections come out of the catalog as a _b0/_b1 buddy pair
+                # Buddies are identical apart from the name suffix and OFFSET
+                statement = self.plain_projection(kind, schema, table, columns, 0)
+                for buddy in range(2):
+                    if index >= count:
+                        break
+                    yield kind, statement.replace(table + '_b0', '{0}_b{1}'.format(table, buddy), 1).replace(
+                        'OFFSET 0;', 'OFFSET {0};'.format(buddy))
+                    index += 1
+            elif kind == UNSEGMENTED:
+                yield kind, self.plain_projection(kind, schema, table, columns, None)
+                index += 1
+            elif kind == LAP:
+                yield kind, self.lap_projection(schema, table, columns)
+                index += 1
+            else:
+                yield kind, self.topk_projection(schema, table, columns)
+                index += 1
+
+    def column_count(self, index):
+        if self.wide_every and index % self.wide_every == self.wide_every - 1:
+            return self.wide_width
+        return self.random.randint(self.min_width, self.max_width)
+
+    def create_line(self, schema, name):
+        line = 'CREATE PROJECTION {0}.{1}'.format(schema, name)
+        if self.random.random() < 0.8:
+            line += ' /*+createtype({0})*/'.format(self.random.choice(CREATE_TYPES))
+        return line
+
+    def column_definitions(self, columns):
+        definitions = []
+        for col in columns:
+            definition = ' ' + col
+            if self.random.random() < 0.7:
+                definition += ' ENCODING ' + self.random.choice(ENCODINGS)
+            if self.random.random() < 0.05:
+                definition += ' ACCESSRANK {0}'.format(self.random.randint(1, 10))
+            definitions.append(definition)
+        return '(\n' + ',\n'.join(definitions) + '\n)'
+
+    def select_list(self, table, columns):
+        return ' SELECT ' + ',\n        '.join('{0}.{1}'.format(table, c) for c in columns)
+
+    def plain_projection(self, kind, schema, table, columns, buddy):
+        name = table + '_super' if buddy is None else '{0}_b{1}'.format(table, buddy)
+        sort_cols = self.random.sample(columns, min(len(columns), self.random.randint(1, 8)))
+        lines = [
+            self.create_line(schema, name),
+            self.column_definitions(columns),
+            'AS',
+            self.select_list(table, columns),
+            ' FROM {0}.{1}'.format(schema, table),
+            ' ORDER BY ' + ',\n          '.join('{0}.{1}'.format(table, c) for c in sort_cols),
+        ]
+        if kind == UNSEGMENTED:
+            lines.append('UNSEGMENTED ALL NODES;')
+        else:
+            hash_type = 'hash' if kind == SEGMENTED_HASH else 'modularhash'
+            seg_cols = ', '.join('{0}.{1}'.format(table, c) for c in sort_cols[:3])
+            lines.append('SEGMENTED BY {0}({1}) ALL NODES KSAFE 1 OFFSET {2};'.format(hash_type, seg_cols, buddy))
+        return '\n'.join(lines)
+
+    def lap_projection(self, schema, table, columns):
+        group_cols = columns[:max(1, len(columns) // 2)]
+        agg_cols = columns[len(group_cols):] or columns[:1]
+        select_items = ['{0}.{1}'.format(table, c) for c in group_cols]
+        select_items += ['{0}({1}.{2}) AS {3}_{2}'.format(f, table, c, f)
+                         for f, c in zip((self.random.choice(AGG_FUNCS) for _ in agg_cols), agg_cols)]
+        proj_cols = group_cols + [item.split(' AS ')[1] for item in select_items[len(group_cols):]]
+        lines = [
+            self.create_line(schema, table + '_agg'),
+            self.column_definitions(proj_cols),
+            'AS',
+            ' SELECT ' + ',\n        '.join(select_items),
+            ' FROM {0}.{1}'.format(schema, table),
+            ' GROUP BY ' + ', '.join('{0}.{1}'.format(table, c) for c in group_cols) + ';',
+        ]
+        return '\n'.join(lines)
+
+    def topk_projection(self, schema, table, columns):
+        partition_cols = columns[:max(1, min(3, len(columns) - 1))]
+        order_col = columns[-1]
+        lines = [
+            self.create_line(schema, table + '_topk'),
+            self.column_definitions(columns),
+            'AS',
+            self.select_list(table, columns),
+            ' FROM {0}.{1}'.format(schema, table),
+            ' LIMIT {0} OVER (PARTITION BY {1} ORDER BY {2}.{3} DESC);'.format(
+                self.random.randint(1, 10),
+                ', '.join('{0}.{1}'.format(table, c) for c in partition_cols),
+                table,
+                order_col,
+            ),
+        ]
+        return '\n'.join(lines)
+
+
+def generate_corpus(count, seed=0, **options):
+    return list(CorpusGenerator(seed, **options).generate(count))
+
+
+def main(argv=None):
+    arg_parser = argparse.ArgumentParser(description='Write a synthetic catalog dump of CREATE PROJECTION statements')
+    arg_parser.add_argument('--count', type=int, default=1000)
+    arg_parser.add_argument('--seed', type=int, default=0)
+    arg_parser.add_argument('--max-width', type=int, default=60)
+    args = arg_parser.parse_args(argv)
+
+    for kind, statement in CorpusGenerator(args.seed, max_width=args.max_width).generate(args.count):
+        sys.stdout.write(statement + '\n\n')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,104 @@
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmarks.corpus import KINDS, generate_corpus
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# The last commit with the single parse path, before projections were classified
+# and dispatched to per kind routines
+DEFAULT_BASELINE = '2096d06'
+
+
+def export_package(revision, directory):
+    # Writes projection_parser as of revision into directory
+    archive = subprocess.run(['git', 'archive', revision, 'projection_parser'], cwd=REPO_ROOT,
+                             stdout=subprocess.PIPE, check=True).stdout
+    subprocess.run(['tar', '-x', '-C', directory], input=archive, check=True)
+
+
+def time_kinds(corpus_path):
+    # Runs in a worker whose sys.path starts with the tree being measured
+    from projection_parser import ProjParser
+
+    with open(corpus_path) as f:
+        corpus = json.load(f)
+    seconds = {}
+    for kind in KINDS + ('all',):
+        statements = [s for k, s in corpus if kind in (k, 'all')]
+        if not statements:
+            continue
+        start = time.perf_counter()
+        for statement in statements:
+            proj = ProjParser()
+            proj.raw_proj = statement
+            proj.parse_projection()
+        seconds[kind] = (len(statements), time.perf_counter() - start)
+    return seconds
+
+
+def run_worker(tree, corpus_path):
+    # The working directory comes first on sys.path, so the worker imports the
+    # projection_parser of tree and benchmarks from the repository
+    env = dict(os.environ, PYTHONPATH=REPO_ROOT)
+    output = subprocess.run([sys.executable, '-m', 'benchmarks.kind_dispatch', '--worker', corpus_path],
+                            cwd=tree, env=env, stdout=subprocess.PIPE, check=True).stdout
+    return json.loads(output)
+
+
+def compare(trees, corpus_path, repeat):
+    # Alternate the two trees so that drift in machine load hits both alike
+    best = {name: {} for name in trees}
+    for _ in range(repeat):
+        for name, tree in trees.items():
+            for kind, (count, seconds) in run_worker(tree, corpus_path).items():
+                previous = best[name].get(kind)
+                best[name][kind] = (count, seconds if previous is None else min(previous[1], seconds))
+    return best
+
+
+def main(argv=None):
+    arg_parser = argparse.ArgumentParser(description='Compare kind dispatched parsing with the single parse path of an earlier commit')
+    arg_parser.add_argument('--count', type=int, default=2000)
+    arg_parser.add_argument('--seed', type=int, default=0)
+    arg_parser.add_argument('--repeat', type=int, default=5)
+    arg_parser.add_argument('--baseline', default=DEFAULT_BASELINE, help='git revision to compare with (default {0})'.format(DEFAULT_BASELINE))
+    arg_parser.add_argument('--current', help='git revision to measure instead of the working tree')
+    arg_parser.add_argument('--worker', metavar='CORPUS', help=argparse.SUPPRESS)
+    args = arg_parser.parse_args(argv)
+
+    if args.worker:
+        json.dump(time_kinds(args.worker), sys.stdout)
+        return 0
+
+    with tempfile.TemporaryDirectory() as directory:
+        corpus_path = os.path.join(directory, 'corpus.json')
+        with open(corpus_path, 'w') as f:
+            json.dump(generate_corpus(args.count, args.seed), f)
+        trees = {'baseline': os.path.join(directory, 'baseline'), 'current': REPO_ROOT}
+        if args.current:
+            trees['current'] = os.path.join(directory, 'current')
+        for name, revision in (('baseline', args.baseline), ('current', args.current)):
+            if revision:
+                os.mkdir(trees[name])
+                export_package(revision, trees[name])
+        best = compare(trees, corpus_path, args.repeat)
+
+    print('{0:<24} {1:>14} {2:>14} {3:>8}'.format('kind', 'baseline/s', 'dispatched/s', 'gain'))
+    for kind in KINDS + ('all',):
+        if kind not in best['current']:
+            continue
+        count, seconds = best['current'][kind]
+        baseline = count / best['baseline'][kind][1]
+        dispatched = count / seconds
+        print('{0:<24} {1:>14.0f} {2:>14.0f} {3:>7.2f}x'.format(kind, baseline, dispatched, dispatched / baseline))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
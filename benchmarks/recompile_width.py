@@ -0,0 +1,62 @@
+import argparse
+import time
+
+from benchmarks.corpus import wide_projection
+from projection_parser import ProjParser
+
+DEFAULT_WIDTHS = (10, 100, 500, 1000, 1500, 3000, 6000)
+
+
+def best_time(func, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def time_parse(width, repeat):
+    # parse_projection includes building the Projection, which is also timed on its own
+    text = wide_projection(width)
+
+    def parse():
+        proj = ProjParser()
+        proj.raw_proj = text
+        proj.parse_projection()
+
+    proj = ProjParser()
+    proj.raw_proj = text
+    proj.parse_projection()
+    return best_time(parse, repeat), best_time(proj.to_projection, repeat)
+
+
+def time_recompile(width, repeat):
+    proj = ProjParser()
+    proj.raw_proj = wide_projection(width)
+    proj.parse_projection()
+    start = time.perf_counter()
+    for _ in range(repeat):
+        # Without this every call after the first returns the cached sections
+        proj.invalidate_compiled_sections()
+        proj.recompile_projection()
+    return (time.perf_counter() - start) / repeat
+
+
+def main(argv=None):
+    arg_parser = argparse.ArgumentParser(description='Measure how parse and recompile time scale with column count')
+    arg_parser.add_argument('--widths', type=int, nargs='+', default=DEFAULT_WIDTHS)
+    arg_parser.add_argument('--repeat', type=int, default=20)
+    args = arg_parser.parse_args(argv)
+
+    print('{0:>8} {1:>10} {2:>10} {3:>12} {4:>16}'.format('columns', 'parse ms', 'model ms', 'recompile ms', 'recompile us/col'))
+    for width in args.widths:
+        parse_seconds, model_seconds = time_parse(width, args.repeat)
+        seconds = time_recompile(width, args.repeat)
+        print('{0:>8} {1:>10.3f} {2:>10.3f} {3:>12.3f} {4:>16.3f}'.format(
+            width, parse_seconds * 1000, model_seconds * 1000, seconds * 1000, seconds * 1e6 / width))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,157 @@
+import argparse
+import json
+import platform
+import sys
+import time
+import tracemalloc
+
+from benchmarks.corpus import KINDS, generate_corpus
+from projection_parser import ProjParser
+from projection_parser.lazy import LazyProjParser
+
+PHASES = ('parse', 'header', 'recompile')
+DEFAULT_TOLERANCE = 0.10
+
+
+def parse_statement(statement):
+    proj = ProjParser()
+    proj.raw_proj = statement
+    return proj.parse_projection()
+
+
+def parse_header(statement):
+    proj = LazyProjParser()
+    proj.raw_proj = statement
+    proj.parse_header()
+    return proj
+
+
+def recompile_projection(projection):
+    return ProjParser().recompile_projection(projection)
+
+
+def time_phase(func, items, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for item in items:
+            func(item)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def peak_memory(func, items):
+    # Run separately from the timing loop, tracemalloc slows allocation down considerably
+    tracemalloc.start()
+    try:
+        for item in items:
+            func(item)
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def phase_result(func, items, repeat):
+    seconds = time_phase(func, items, repeat)
+    return {
+        'statements': len(items),
+        'seconds': seconds,
+        'statements_per_second': len(items) / seconds if seconds else None,
+    }
+
+
+def run_benchmarks(count, seed, repeat):
+    corpus = generate_corpus(count, seed)
+    statements = [statement for kind, statement in corpus]
+    projections = [parse_statement(statement) for statement in statements]
+    phase_funcs = {
+        'parse': (parse_statement, statements),
+        'header': (parse_header, statements),
+        'recompile': (recompile_projection, projections),
+    }
+
+    results = {}
+    for phase in PHASES:
+        func, items = phase_funcs[phase]
+        result = phase_result(func, items, repeat)
+        result['peak_memory_bytes'] = peak_memory(func, items)
+        result['by_kind'] = {}
+        for kind in KINDS:
+            kind_items = [item for (item_kind, _), item in zip(corpus, items) if item_kind == kind]
+            if kind_items:
+                result['by_kind'][kind] = phase_result(func, kind_items, repeat)
+        results[phase] = result
+
+    return {
+        'meta': {
+            'python': platform.python_version(),
+            'implementation': platform.python_implementation(),
+            'platform': platform.platform(),
+            'count': count,
+            'seed': seed,
+            'repeat': repeat,
+        },
+        'results': results,
+    }
+
+
+def compare_to_baseline(report, baseline, tolerance):
+    # Only the overall throughput of a phase counts as a regression, the per kind
+    # lines show where a change gained or lost
+    regressions = []
+    lines = []
+    for phase in PHASES:
+        if phase not in baseline['results']:
+            continue
+        current = report['results'][phase]
+        previous = baseline['results'][phase]
+        ratio = current['statements_per_second'] / previous['statements_per_second']
+        lines.append(format_comparison(phase, current, previous))
+        for kind in KINDS:
+            if kind in current['by_kind'] and kind in previous.get('by_kind', {}):
+                lines.append(format_comparison('  ' + kind, current['by_kind'][kind], previous['by_kind'][kind]))
+        if ratio < 1 - tolerance:
+            regressions.append(phase)
+    return lines, regressions
+
+
+def format_comparison(label, current, previous):
+    current_rate = current['statements_per_second']
+    previous_rate = previous['statements_per_second']
+    return '{0:<24} {1:>12.0f} stmt/s  baseline {2:>12.0f} stmt/s  x{3:.2f}'.format(
+        label, current_rate, previous_rate, current_rate / previous_rate)
+
+
+def main(argv=None):
+    arg_parser = argparse.ArgumentParser(description='Measure parse and recompile throughput on a synthetic corpus')
+    arg_parser.add_argument('--count', type=int, default=2000)
+    arg_parser.add_argument('--seed', type=int, default=0)
+    arg_parser.add_argument('--repeat', type=int, default=3)
+    arg_parser.add_argument('--output', help='write the JSON report to this file')
+    arg_parser.add_argument('--baseline', help='JSON report of a previous run to compare against')
+    arg_parser.add_argument('--tolerance', type=float, default=DEFAULT_TOLERANCE,
+                            help='allowed throughput drop against the baseline before failing')
+    args = arg_parser.parse_args(argv)
+
+    report = run_benchmarks(args.count, args.seed, args.repeat)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        sys.stdout.write('\n')
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        lines, regressions = compare_to_baseline(report, baseline, args.tolerance)
+        sys.stderr.write('\n'.join(lines) + '\n')
+        if regressions:
+            sys.stderr.write('Regression in: {0}\n'.format(', '.join(regressions)))
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
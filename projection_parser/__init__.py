@@ -3,3 +3,6 @@ try:
     ProjParser = projection_parser.ProjParser
 except:
     from projection_parser import ProjParser
+
+from projection_parser.model import Projection, ProjectionColumn, SelectColumn
+from projection_parser.api import Options, parse, render
@@ -0,0 +1,34 @@
+from collections import namedtuple
+
+from projection_parser.projection_parser import ProjParser
+
+# The style settings of ProjParser as an immutable value, so one Options can be shared
+# by any number of threads
+Options = namedtuple('Options', ['tab_space', 'table_name_with_column_name', 'if_not_exists'],
+                     defaults=(' ' * 2, False, True))
+
+DEFAULT_OPTIONS = Options()
+
+
+def new_parser(options, parser_class=ProjParser):
+    # A ProjParser is private to one call and never escapes it, which is what makes
+    # parse and render reentrant; everything shared between calls is read only
+    proj = parser_class()
+    proj.tab_space = options.tab_space
+    proj.table_name_with_column_name = options.table_name_with_column_name
+    proj.if_not_exists = options.if_not_exists
+    return proj
+
+
+def parse(text, options=DEFAULT_OPTIONS):
+    proj = new_parser(options)
+    proj.raw_proj = text
+    return proj.parse_projection()
+
+
+def render(projection, options=DEFAULT_OPTIONS):
+    return new_parser(options).recompile_projection(projection)
+
+
+def reformat(text, options=DEFAULT_OPTIONS):
+    return render(parse(text, options), options)
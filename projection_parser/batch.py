@@ -0,0 +1,75 @@
+import multiprocessing
+import os
+from collections import namedtuple
+from itertools import islice
+
+from projection_parser.dump_reader import iter_projection_statements
+from projection_parser.projection_parser import ProjParser
+
+DEFAULT_CHUNK_SIZE = 64
+
+ParseResult = namedtuple('ParseResult', ['index', 'projection', 'recompiled_projection', 'error'])
+
+STYLE_SETTINGS = ('tab_space', 'table_name_with_column_name', 'if_not_exists')
+
+
+##########################
+## WORKER               ##
+
+def parse_statement(index, statement, settings, recompile=True):
+    proj = ProjParser()
+    for key, value in settings.items():
+        setattr(proj, key, value)
+    try:
+        proj.raw_proj = statement
+        projection = proj.parse_projection()
+        if recompile:
+            proj.recompile_projection()
+    except Exception as e:
+        return ParseResult(index, None, None, '{0}: {1}'.format(type(e).__name__, e))
+    return ParseResult(index, projection, proj.recompiled_projection, None)
+
+
+def parse_chunk(args):
+    chunk, settings, recompile = args
+    return [parse_statement(index, statement, settings, recompile) for index, statement in chunk]
+
+
+##########################
+## DISPATCH             ##
+
+def iter_sources(sources):
+    for source in sources:
+        if isinstance(source, str) and not os.path.isfile(source):
+            yield source
+        else:
+            yield from iter_projection_statements(source)
+
+
+def iter_chunks(sources, chunk_size, settings, recompile):
+    statements = enumerate(iter_sources(sources))
+    while True:
+        chunk = list(islice(statements, chunk_size))
+        if not chunk:
+            break
+        yield chunk, settings, recompile
+
+
+def parse_batch(sources, processes=None, chunk_size=DEFAULT_CHUNK_SIZE, ordered=True, recompile=True, **settings):
+    unknown = set(settings) - set(STYLE_SETTINGS)
+    if unknown:
+        raise TypeError('Unknown style settings: {}'.format(', '.join(sorted(unknown))))
+
+    chunks = iter_chunks(sources, chunk_size, settings, recompile)
+    if processes == 1:
+        for chunk in chunks:
+            yield from parse_chunk(chunk)
+        return
+
+    with multiprocessing.Pool(processes) as pool:
+        if ordered:
+            results = pool.imap(parse_chunk, chunks)
+        else:
+            results = pool.imap_unordered(parse_chunk, chunks)
+        for chunk_results in results:
+            yield from chunk_results
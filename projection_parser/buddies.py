@@ -0,0 +1,96 @@
+import hashlib
+import re
+from collections import namedtuple
+
+from projection_parser.catalog_diff import diff_projections
+from projection_parser.dump_reader import TEXT_SYNTAX, iter_projection_statements
+from projection_parser.projection_parser import ProjParser, buddy_pattern
+
+_offset_pattern = re.compile(r'\bOFFSET\s+(\d+)', re.IGNORECASE)
+
+BuddyHeader = namedtuple('BuddyHeader', ['group', 'projection_name', 'buddy', 'offset', 'digest'])
+BuddyResult = namedtuple('BuddyResult', ['index', 'projection', 'derived'])
+BuddyMismatch = namedtuple('BuddyMismatch', ['group', 'representative', 'buddy', 'changes'])
+
+
+def read_buddy_header(statement):
+    header_match = TEXT_SYNTAX.create_projection_pattern.match(statement)
+    if not header_match:
+        return None
+    full_name = header_match.group(1)
+    buddy_match = buddy_pattern.search(full_name)
+    if not buddy_match:
+        return None
+
+    # Everything but the projection name and OFFSET has to match between buddies
+    # Buddies are exported byte for byte the same, so the body is hashed as is
+    parts = _offset_pattern.split(statement[header_match.end():].rstrip().rstrip(';'))
+    offsets = parts[1::2]
+    digest = hashlib.sha1(''.join(parts[::2]).encode('utf-8')).hexdigest()
+    return BuddyHeader(
+        full_name[:buddy_match.start()].lower(),
+        full_name.split('.')[-1],
+        int(buddy_match.group(0)[2:]),
+        int(offsets[-1]) if offsets else None,
+        digest,
+    )
+
+
+class BuddyDeduplicator():
+    def __init__(self, table_name_with_column_name=False):
+        self.table_name_with_column_name = table_name_with_column_name
+        self.representatives = {}  # group -> (digest, Projection)
+        self.mismatches = []
+        self.parsed = 0
+        self.derived = 0
+
+    def parse_full(self, statement):
+        proj = ProjParser()
+        proj.table_name_with_column_name = self.table_name_with_column_name
+        proj.raw_proj = statement
+        self.parsed += 1
+        return proj.parse_projection()
+
+    def parse(self, statement):
+        header = read_buddy_header(statement)
+        if header is None:
+            return self.parse_full(statement), False
+
+        representative = self.representatives.get(header.group)
+        if representative is None:
+            projection = self.parse_full(statement)
+            self.representatives[header.group] = (header.digest, projection)
+            return projection, False
+
+        digest, rep_projection = representative
+        if digest == header.digest:
+            self.derived += 1
+            projection = rep_projection._replace(
+                projection_name=header.projection_name,
+                buddy=header.buddy,
+                offset=header.offset,
+            )
+            return projection, True
+
+        projection = self.parse_full(statement)
+        comparable = projection._replace(
+            projection_name=rep_projection.projection_name,
+            buddy=rep_projection.buddy,
+            offset=rep_projection.offset,
+        )
+        changes = diff_projections(rep_projection, comparable)
+        if changes:
+            self.mismatches.append(BuddyMismatch(header.group, rep_projection.projection_name, projection.projection_name, changes))
+        return projection, False
+
+
+def parse_with_buddies(statements, deduplicator=None, table_name_with_column_name=False):
+    if deduplicator is None:
+        deduplicator = BuddyDeduplicator(table_name_with_column_name)
+    for index, statement in enumerate(statements):
+        projection, derived = deduplicator.parse(statement)
+        yield BuddyResult(index, projection, derived)
+
+
+def parse_dump_with_buddies(source, deduplicator=None, table_name_with_column_name=False):
+    return parse_with_buddies(iter_projection_statements(source), deduplicator, table_name_with_column_name)
@@ -0,0 +1,209 @@
+from collections import namedtuple
+
+from projection_parser.api import DEFAULT_OPTIONS, new_parser, parse, render
+from projection_parser.catalog_diff import format_error
+from projection_parser.cli import DEFAULT_BUFFER_SIZE, BufferedWriter
+from projection_parser.dump_reader import DEFAULT_CHUNK_SIZE, iter_projection_statements
+from projection_parser.lazy import LazyProjParser
+
+DEFAULT_BATCH_SIZE = 500
+
+# Refresh statements written after each batch
+REFRESH = 'refresh'
+START_REFRESH = 'start_refresh'
+
+# duplicates are buddies of a projection already written, errors statements that failed
+RewriteStats = namedtuple('RewriteStats', ['scanned', 'matched', 'rewritten', 'batches', 'duplicates', 'errors'])
+
+
+##########################
+## TRANSFORMATIONS      ##
+
+# Each transformation maps a Projection to a Projection and returns it unchanged when
+# it does not apply, e.g. sort order changes on Top-K or live aggregate projections
+
+def has_sort_order(projection):
+    return not projection.is_topk and not projection.is_lap
+
+
+class AddSortColumn(namedtuple('AddSortColumn', ['column', 'position'], defaults=(None,))):
+    __slots__ = ()
+
+    def apply(self, projection):
+        select_columns = set(c.col_name for c in projection.select_list)
+        if not has_sort_order(projection) or self.column in projection.order_by_list or self.column not in select_columns:
+            return projection
+        order_by_list = list(projection.order_by_list)
+        order_by_list.insert(len(order_by_list) if self.position is None else self.position, self.column)
+        return projection._replace(order_by_list=tuple(order_by_list))
+
+
+class SetSegmentation(namedtuple('SetSegmentation', ['columns', 'modularhash'], defaults=(False,))):
+    __slots__ = ()
+
+    def apply(self, projection):
+        if not has_sort_order(projection):
+            return projection
+        return projection._replace(segmentation_spec=True, modularhash=self.modularhash, segment_columns=tuple(self.columns))
+
+
+class StripCreateType(namedtuple('StripCreateType', [])):
+    __slots__ = ()
+
+    def apply(self, projection):
+        return projection._replace(create_type=None)
+
+
+def apply_transformations(projection, transformations):
+    for transformation in transformations:
+        projection = transformation.apply(projection)
+    return projection
+
+
+##########################
+## FILTER               ##
+
+class AnchorFilter():
+    # tables are 'table' or 'schema.table'; names compare case-insensitively
+    def __init__(self, tables=None, schemas=None):
+        self.tables = None
+        self.schema_tables = None
+        if tables is not None:
+            self.tables = set()
+            self.schema_tables = set()
+            for table in tables:
+                if '.' in table:
+                    self.schema_tables.add(tuple(table.lower().rsplit('.', 1)))
+                else:
+                    self.tables.add(table.lower())
+        self.schemas = None if schemas is None else set(s.lower() for s in schemas)
+
+    def is_empty(self):
+        return self.tables is None and self.schemas is None
+
+    def matches(self, schema, table):
+        schema = (schema or '').lower()
+        table = (table or '').lower()
+        if self.schemas is not None and schema not in self.schemas:
+            return False
+        if self.tables is not None:
+            return table in self.tables or (schema, table) in self.schema_tables
+        return True
+
+
+##########################
+## REWRITE              ##
+
+def refresh_statement(tables, refresh):
+    if refresh == START_REFRESH:
+        return 'SELECT START_REFRESH();'
+    return "SELECT REFRESH('{0}');".format(', '.join(tables))
+
+
+def anchor_name(projection):
+    return '.'.join(part for part in (projection.from_schema, projection.from_table) if part)
+
+
+class BulkRewriter():
+    def __init__(self, transformations, out, tables=None, schemas=None, batch_size=DEFAULT_BATCH_SIZE,
+                 refresh=None, options=DEFAULT_OPTIONS, buffer_size=DEFAULT_BUFFER_SIZE):
+        if refresh not in (None, REFRESH, START_REFRESH):
+            raise ValueError('Unknown refresh mode {0!r}'.format(refresh))
+        self.transformations = tuple(transformations)
+        self.anchor_filter = AnchorFilter(tables, schemas)
+        self.writer = BufferedWriter(out, buffer_size)
+        self.batch_size = batch_size
+        self.refresh = refresh
+        self.options = options
+        self.batch = []
+        self.batch_tables = {}  # insertion ordered set of anchor tables in the batch
+        self.written_keys = set()  # (database, schema, basename) of every statement written
+        self.scanned = 0
+        self.matched = 0
+        self.rewritten = 0
+        self.batches = 0
+        self.duplicates = 0
+        self.errors = 0
+
+    def matches(self, projection):
+        return self.anchor_filter.matches(projection.from_schema, projection.from_table)
+
+    def add(self, projection):
+        self.scanned += 1
+        if not self.matches(projection):
+            return False
+        self.matched += 1
+        rewritten = apply_transformations(projection, self.transformations)
+        if rewritten == projection:
+            return False
+        # The buddy suffix and OFFSET are not rendered, so every buddy of a projection
+        # renders to the same statement; Vertica creates the buddies from that one
+        key = (rewritten.projection_database, rewritten.projection_schema, rewritten.projection_basename)
+        if key in self.written_keys:
+            self.duplicates += 1
+            return False
+        ddl = render(rewritten, self.options)
+        self.written_keys.add(key)
+        self.rewritten += 1
+        self.batch.append(ddl)
+        self.batch_tables[anchor_name(rewritten)] = None
+        if len(self.batch) >= self.batch_size:
+            self.write_batch()
+        return True
+
+    def write_batch(self):
+        if not self.batch:
+            return
+        self.writer.write('\n\n'.join(self.batch) + '\n\n')
+        if self.refresh is not None:
+            self.writer.write(refresh_statement(self.batch_tables, self.refresh) + '\n\n')
+        self.batch = []
+        self.batch_tables = {}
+        self.batches += 1
+
+    def finish(self):
+        self.write_batch()
+        self.writer.flush()
+        return self.stats()
+
+    def stats(self):
+        return RewriteStats(self.scanned, self.matched, self.rewritten, self.batches, self.duplicates, self.errors)
+
+
+def bulk_rewrite(projections, transformations, out, **kwargs):
+    rewriter = BulkRewriter(transformations, out, **kwargs)
+    for projection in projections:
+        rewriter.add(projection)
+    return rewriter.finish()
+
+
+def rewrite_statement(rewriter, header_parser, statement, options):
+    if header_parser is None:
+        rewriter.add(parse(statement, options))
+        return
+    header_parser.raw_proj = statement
+    header_parser.parse_header()
+    if rewriter.matches(header_parser):
+        rewriter.add(header_parser.to_projection())
+    else:
+        rewriter.scanned += 1
+
+
+def bulk_rewrite_dump(source, transformations, out, chunk_size=DEFAULT_CHUNK_SIZE, errors=None, **kwargs):
+    # A statement that fails to parse or render is skipped and counted in the stats;
+    # with an errors list, a 'path: statement N: Type: message' line is added to it
+    rewriter = BulkRewriter(transformations, out, **kwargs)
+    options = kwargs.get('options', DEFAULT_OPTIONS)
+    # With a filter, statements are read lazily so that only the anchor table is parsed
+    # for the projections it rejects
+    header_parser = None if rewriter.anchor_filter.is_empty() else new_parser(options, LazyProjParser)
+    for number, statement in enumerate(iter_projection_statements(source, chunk_size), 1):
+        scanned = rewriter.scanned
+        try:
+            rewrite_statement(rewriter, header_parser, statement, options)
+        except Exception as e:
+            rewriter.scanned = scanned + 1
+            rewriter.errors += 1
+            if errors is not None:
+                errors.append(format_error(source, number, e))
+    return rewriter.finish()
@@ -0,0 +1,117 @@
+import hashlib
+import pickle
+import sqlite3
+from collections import OrderedDict, namedtuple
+
+from projection_parser.projection_parser import PARSER_VERSION
+
+DEFAULT_MAX_ENTRIES = 10000
+COMMIT_EVERY = 500
+
+CacheStats = namedtuple('CacheStats', ['hits', 'disk_hits', 'misses', 'evictions', 'entries'])
+
+
+def normalize_statement(raw_proj):
+    statement = raw_proj.strip()
+    if statement.endswith(';'):
+        statement = statement[:-1]
+    return ' '.join(statement.split())
+
+
+def statement_key(raw_proj, table_name_with_column_name=False):
+    # Settings that change the parse result are part of the key
+    key_text = '{0}\0{1}\0{2}'.format(PARSER_VERSION, int(bool(table_name_with_column_name)), normalize_statement(raw_proj))
+    return hashlib.sha256(key_text.encode('utf-8')).hexdigest()
+
+
+class ParseCache():
+    def __init__(self, max_entries=DEFAULT_MAX_ENTRIES, path=None):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.pending_writes = 0
+        self.connection = None
+        if path is not None:
+            self.open_disk_tier(path)
+
+    def open_disk_tier(self, path):
+        self.connection = sqlite3.connect(path)
+        self.connection.execute('PRAGMA journal_mode=WAL')
+        self.connection.execute('PRAGMA synchronous=NORMAL')
+        self.connection.execute(
+            'CREATE TABLE IF NOT EXISTS parse_cache ('
+            'key TEXT PRIMARY KEY, parser_version INTEGER NOT NULL, projection BLOB NOT NULL)'
+        )
+        self.connection.execute('DELETE FROM parse_cache WHERE parser_version != ?', (PARSER_VERSION,))
+        self.connection.commit()
+
+    def parse(self, parser):
+        key = statement_key(parser.raw_proj, parser.table_name_with_column_name)
+        projection = self.get(key)
+        if projection is not None:
+            parser.load_projection(projection)
+            parser.proj_parts = parser.raw_proj
+            return projection
+        parser.parse_clauses()
+        projection = parser.to_projection()
+        self.put(key, projection)
+        return projection
+
+    def get(self, key):
+        projection = self.entries.get(key)
+        if projection is not None:
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return projection
+        if self.connection is not None:
+            row = self.connection.execute(
+                'SELECT projection FROM parse_cache WHERE key = ? AND parser_version = ?', (key, PARSER_VERSION)
+            ).fetchone()
+            if row is not None:
+                projection = pickle.loads(row[0])
+                self.remember(key, projection)
+                self.disk_hits += 1
+                return projection
+        self.misses += 1
+        return None
+
+    def put(self, key, projection):
+        self.remember(key, projection)
+        if self.connection is not None:
+            self.connection.execute(
+                'INSERT OR REPLACE INTO parse_cache (key, parser_version, projection) VALUES (?, ?, ?)',
+                (key, PARSER_VERSION, pickle.dumps(projection, pickle.HIGHEST_PROTOCOL)),
+            )
+            self.pending_writes += 1
+            if self.pending_writes >= COMMIT_EVERY:
+                self.flush()
+
+    def remember(self, key, projection):
+        self.entries[key] = projection
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+            self.evictions += 1
+
+    def stats(self):
+        return CacheStats(self.hits, self.disk_hits, self.misses, self.evictions, len(self.entries))
+
+    def flush(self):
+        if self.connection is not None and self.pending_writes:
+            self.connection.commit()
+            self.pending_writes = 0
+
+    def close(self):
+        self.flush()
+        if self.connection is not None:
+            self.connection.close()
+            self.connection = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
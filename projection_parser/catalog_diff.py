@@ -0,0 +1,171 @@
+import argparse
+import json
+import sys
+from collections import namedtuple
+
+from projection_parser.dump_reader import DEFAULT_CHUNK_SIZE, iter_projections
+
+ADDED = 'added'
+REMOVED = 'removed'
+MODIFIED = 'modified'
+
+FieldChange = namedtuple('FieldChange', ['field', 'old', 'new'])
+ProjectionDiff = namedtuple('ProjectionDiff', ['key', 'status', 'changes'])
+
+# Projection fields compared one to one. Columns are compared separately so that
+# encoding and access rank changes are reported per column.
+COMPARED_FIELDS = (
+    'create_type',
+    'from_database',
+    'from_schema',
+    'from_table',
+    'select_list',
+    'group_by_columns',
+    'order_by_list',
+    'segmentation_spec',
+    'modularhash',
+    'segment_columns',
+    'ksafe',
+    'offset',
+    'is_lap',
+    'is_topk',
+    'topk_limit',
+    'topk_partition',
+    'topk_order_by',
+)
+
+
+def projection_key(projection):
+    return (projection.projection_database, projection.projection_schema, projection.projection_basename, projection.buddy)
+
+
+def format_key(key):
+    db, schema, basename, buddy = key
+    name = '.'.join(part for part in (db, schema, basename) if part)
+    return name + '_b{0}'.format(buddy) if buddy is not None else name
+
+
+##########################
+## DIFF                 ##
+
+def diff_columns(old_columns, new_columns):
+    changes = []
+    old_names = tuple(c.col_name for c in old_columns)
+    new_names = tuple(c.col_name for c in new_columns)
+    if old_names != new_names:
+        changes.append(FieldChange('projection_col_list', old_names, new_names))
+    new_by_name = {c.col_name: c for c in new_columns}
+    for old_col in old_columns:
+        new_col = new_by_name.get(old_col.col_name)
+        if new_col is None:
+            continue
+        if old_col.encoding != new_col.encoding:
+            changes.append(FieldChange('encoding.' + old_col.col_name, old_col.encoding, new_col.encoding))
+        if old_col.accessrank != new_col.accessrank:
+            changes.append(FieldChange('accessrank.' + old_col.col_name, old_col.accessrank, new_col.accessrank))
+    return changes
+
+
+def diff_projections(old, new):
+    changes = []
+    if old.projection_col_list != new.projection_col_list:
+        changes.extend(diff_columns(old.projection_col_list, new.projection_col_list))
+    for field in COMPARED_FIELDS:
+        old_value = getattr(old, field)
+        new_value = getattr(new, field)
+        if old_value != new_value:
+            changes.append(FieldChange(field, old_value, new_value))
+    return changes
+
+
+def index_projections(projections):
+    index = {}
+    for projection in projections:
+        index[projection_key(projection)] = projection
+    return index
+
+
+def format_error(source, number, error):
+    name = source if isinstance(source, str) else getattr(source, 'name', '<stream>')
+    return '{0}: statement {1}: {2}: {3}'.format(name, number, type(error).__name__, error)
+
+
+def iter_models(source, chunk_size, errors=None, **settings):
+    # With an errors list, statements that fail to parse are recorded there and
+    # skipped; without one the first failure is raised
+    on_error = None
+    if errors is not None:
+        def on_error(number, error):
+            errors.append(format_error(source, number, error))
+    for proj in iter_projections(source, chunk_size, on_error=on_error, **settings):
+        yield proj.to_projection()
+
+
+def diff_catalogs(old_source, new_source, chunk_size=DEFAULT_CHUNK_SIZE, errors=None, **settings):
+    # Only the old side is held in memory; the new side is streamed against it
+    old_index = index_projections(iter_models(old_source, chunk_size, errors, **settings))
+    for new in iter_models(new_source, chunk_size, errors, **settings):
+        key = projection_key(new)
+        old = old_index.pop(key, None)
+        if old is None:
+            yield ProjectionDiff(key, ADDED, [])
+        elif old != new:
+            changes = diff_projections(old, new)
+            if changes:
+                yield ProjectionDiff(key, MODIFIED, changes)
+    for key in old_index:
+        yield ProjectionDiff(key, REMOVED, [])
+
+
+##########################
+## CLI                  ##
+
+STATUS_MARKERS = {ADDED: '+', REMOVED: '-', MODIFIED: '~'}
+
+
+def format_value(value):
+    if isinstance(value, tuple):
+        return '(' + ', '.join(format_value(v) for v in value) + ')'
+    return str(value)
+
+
+def format_text(diff):
+    lines = ['{0} {1}'.format(STATUS_MARKERS[diff.status], format_key(diff.key))]
+    for change in diff.changes:
+        lines.append('    {0}: {1} -> {2}'.format(change.field, format_value(change.old), format_value(change.new)))
+    return '\n'.join(lines)
+
+
+def format_json(diff):
+    return json.dumps({
+        'projection': format_key(diff.key),
+        'key': diff.key,
+        'status': diff.status,
+        'changes': [{'field': c.field, 'old': c.old, 'new': c.new} for c in diff.changes],
+    })
+
+
+def main(argv=None):
+    arg_parser = argparse.ArgumentParser(prog='projection-diff', description='Compare the projections in two catalog dumps')
+    arg_parser.add_argument('old', help='catalog dump before the change')
+    arg_parser.add_argument('new', help='catalog dump after the change')
+    arg_parser.add_argument('--json', action='store_true', help='write one JSON object per projection')
+    arg_parser.add_argument('--table-name-with-column-name', action='store_true')
+    args = arg_parser.parse_args(argv)
+
+    formatter = format_json if args.json else format_text
+    found = False
+    errors = []
+    for diff in diff_catalogs(args.old, args.new, errors=errors, table_name_with_column_name=args.table_name_with_column_name):
+        found = True
+        sys.stdout.write(formatter(diff) + '\n')
+    for error in errors:
+        sys.stderr.write(error + '\n')
+    # Like diff(1): 1 when the catalogs differ, 2 when statements could not be read
+    if errors:
+        return 2
+    return 1 if found else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
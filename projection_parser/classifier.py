@@ -0,0 +1,117 @@
+import re
+
+from projection_parser.lexer import KEYWORD, OP, tokenize
+
+SEGMENTED = 'segmented'
+UNSEGMENTED = 'unsegmented'
+LAP = 'lap'
+TOPK = 'topk'
+PROJECTION_KINDS = (SEGMENTED, UNSEGMENTED, LAP, TOPK)
+
+# Comments, quoted spans and parentheses are all that is needed to find the top level
+# parts of a statement. The regex engine skips every other character without a Python
+# level step, which makes this scan several times cheaper than tokenizing.
+_structure_pattern = re.compile(r'''(?=[/"'()\-])(?:
+    /\*.*?\*/
+  | --[^\n]*
+  | "(?:[^"]|"")*"
+  | '(?:[^']|'')*'
+  | ([()])
+)''', re.VERBOSE | re.DOTALL)
+
+
+def is_word_char(char):
+    return char.isalnum() or char in '_.$"'
+
+
+def rfind_keyword(text, word, start, end):
+    upper = text[start:end].upper()
+    idx = len(upper)
+    while True:
+        idx = upper.rfind(word, 0, idx)
+        if idx < 0:
+            return -1
+        after = idx + len(word)
+        if (idx == 0 or not is_word_char(upper[idx - 1])) and (after == len(upper) or not is_word_char(upper[after])):
+            return start + idx
+
+
+def scan_layout(text):
+    # Returns the span of the projection column list, the offset of the top level FROM
+    # and whether a top level parenthesis (a function call) appears in the select list
+    depth = 0
+    column_list = None
+    gap_start = None
+    gaps = []
+    calls = []
+    for match in _structure_pattern.finditer(text):
+        paren = match.group(1)
+        if depth == 0 and column_list is not None:
+            gaps.append((gap_start, match.start()))
+            gap_start = match.end()
+        if paren == '(':
+            if depth == 0:
+                if column_list is None:
+                    column_list = [match.start(), None]
+                else:
+                    calls.append(match.start())
+            depth += 1
+        elif paren == ')':
+            depth -= 1
+            if depth < 0:
+                raise ValueError("Unbalanced ')' at offset {0}".format(match.start()))
+            if depth == 0:
+                if column_list[1] is None:
+                    column_list[1] = match.end()
+                gap_start = match.end()
+    if column_list is None or column_list[1] is None:
+        raise ValueError('Expected a projection column list')
+    gaps.append((gap_start, len(text)))
+
+    for start, end in reversed(gaps):
+        from_start = rfind_keyword(text, 'FROM', start, end)
+        if from_start >= 0:
+            break
+    else:
+        raise ValueError('Expected FROM after the select list')
+    return column_list[0], column_list[1], from_start, any(call < from_start for call in calls)
+
+
+def index_top_level_keywords(tokens, start=0):
+    positions = {}
+    depth = 0
+    for idx in range(start, len(tokens)):
+        token = tokens[idx]
+        if token.kind == OP:
+            if token.value == '(':
+                depth += 1
+            elif token.value == ')':
+                depth -= 1
+        elif depth == 0 and token.kind == KEYWORD and token.upper not in positions:
+            positions[token.upper] = idx
+    return positions
+
+
+def projection_kind(tokens, positions):
+    # positions maps each top level keyword to the index of its first token
+    over_idx = positions.get('OVER')
+    if over_idx is not None and over_idx + 2 < len(tokens):
+        if tokens[over_idx + 1].value == '(' and tokens[over_idx + 2].upper == 'PARTITION':
+            return TOPK
+    if 'GROUP' in positions:
+        return LAP
+    if 'UNSEGMENTED' in positions:
+        return UNSEGMENTED
+    return SEGMENTED
+
+
+def classify_tokens(tokens, start=0):
+    positions = index_top_level_keywords(tokens, start)
+    return projection_kind(tokens, positions), positions
+
+
+def classify_projection(text):
+    # Only the tail after FROM is tokenized, the rest is covered by scan_layout
+    from_start = scan_layout(text)[2]
+    tokens = tokenize(text, from_start)[0]
+    return projection_kind(tokens, index_top_level_keywords(tokens))
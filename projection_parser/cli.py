@@ -0,0 +1,103 @@
+import argparse
+import os
+import sys
+
+from projection_parser.dump_reader import DEFAULT_CHUNK_SIZE, is_projection_statement, iter_statements, strip_leading_noise
+from projection_parser.projection_parser import ProjParser
+
+DEFAULT_BUFFER_SIZE = 1024 * 1024
+
+
+class BufferedWriter():
+    def __init__(self, stream, buffer_size=DEFAULT_BUFFER_SIZE):
+        self.stream = stream
+        self.buffer_size = buffer_size
+        self.parts = []
+        self.size = 0
+
+    def write(self, text):
+        self.parts.append(text)
+        self.size += len(text)
+        if self.size >= self.buffer_size:
+            self.flush()
+
+    def flush(self):
+        if self.parts:
+            self.stream.write(''.join(self.parts))
+            self.parts = []
+            self.size = 0
+        self.stream.flush()
+
+
+def build_arg_parser():
+    arg_parser = argparse.ArgumentParser(
+        prog='projection-parser',
+        description='Recompile the CREATE PROJECTION statements read from files or stdin and write them to stdout',
+    )
+    arg_parser.add_argument('files', nargs='*', default=['-'], help="DDL files to read, '-' for stdin (default)")
+    arg_parser.add_argument('--tab-space', type=int, default=2, metavar='N', help='indent with N spaces (default 2)')
+    arg_parser.add_argument('--if-not-exists', dest='if_not_exists', action='store_true', default=True,
+                            help='write CREATE PROJECTION IF NOT EXISTS (default)')
+    arg_parser.add_argument('--no-if-not-exists', dest='if_not_exists', action='store_false')
+    arg_parser.add_argument('--table-name-with-column-name', action='store_true',
+                            help='keep table prefixes on column names')
+    arg_parser.add_argument('--passthrough', action='store_true',
+                            help='copy statements other than CREATE PROJECTION to the output unchanged')
+    arg_parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE, help='bytes read per chunk')
+    arg_parser.add_argument('--buffer-size', type=int, default=DEFAULT_BUFFER_SIZE, help='bytes buffered per write')
+    return arg_parser
+
+
+def open_source(path):
+    if path == '-':
+        return sys.stdin.buffer
+    return open(path, 'rb')
+
+
+def recompile_statement(statement, args):
+    proj = ProjParser()
+    proj.tab_space = ' ' * args.tab_space
+    proj.if_not_exists = args.if_not_exists
+    proj.table_name_with_column_name = args.table_name_with_column_name
+    proj.raw_proj = statement
+    proj.parse_projection()
+    return proj.recompile_projection()
+
+
+def rewrite(args, out, err):
+    errors = 0
+    for path in args.files:
+        source = open_source(path)
+        try:
+            for count, statement in enumerate(iter_statements(source, args.chunk_size), 1):
+                statement = strip_leading_noise(statement)
+                if is_projection_statement(statement):
+                    try:
+                        out.write(recompile_statement(statement, args) + '\n\n')
+                    except Exception as e:
+                        errors += 1
+                        err.write('{0}: statement {1}: {2}: {3}\n'.format(path, count, type(e).__name__, e))
+                elif args.passthrough and statement.strip():
+                    out.write(statement.strip() + ';\n\n')
+        finally:
+            if source is not sys.stdin.buffer:
+                source.close()
+    return errors
+
+
+def main(argv=None):
+    args = build_arg_parser().parse_args(argv)
+    out = BufferedWriter(sys.stdout, args.buffer_size)
+    try:
+        errors = rewrite(args, out, sys.stderr)
+        out.flush()
+    except BrokenPipeError:
+        # The reader went away (e.g. `| head`); stop quietly like other filters
+        devnull = os.open(os.devnull, os.O_WRONLY)
+        os.dup2(devnull, sys.stdout.fileno())
+        return 1
+    return 1 if errors else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
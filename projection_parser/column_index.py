@@ -0,0 +1,159 @@
+import json
+import os
+from collections import defaultdict
+
+from projection_parser.catalog_diff import projection_key
+from projection_parser.dump_reader import iter_projections
+
+INDEX_VERSION = 1
+
+COLUMN_LIST = 'column_list'
+SELECT_LIST = 'select_list'
+GROUP_BY = 'group_by'
+ORDER_BY = 'order_by'
+SEGMENTATION = 'segmentation'
+TOPK_PARTITION = 'topk_partition'
+TOPK_ORDER_BY = 'topk_order_by'
+
+
+def name_key(name):
+    return name.lower() if name else ''
+
+
+def table_key(schema, table):
+    return (name_key(schema), name_key(table))
+
+
+def split_topk_columns(clause):
+    # topk_partition / topk_order_by are stored as 'a, b DESC'
+    return [c.split()[0] for c in clause.split(',') if c.strip()]
+
+
+def projection_references(projection):
+    refs = []
+    refs.extend((COLUMN_LIST, c.col_name) for c in projection.projection_col_list)
+    refs.extend((SELECT_LIST, c.col_name) for c in projection.select_list)
+    refs.extend((GROUP_BY, c) for c in projection.group_by_columns)
+    refs.extend((ORDER_BY, c) for c in projection.order_by_list)
+    refs.extend((SEGMENTATION, c) for c in projection.segment_columns)
+    refs.extend((TOPK_PARTITION, c) for c in split_topk_columns(projection.topk_partition or ''))
+    refs.extend((TOPK_ORDER_BY, c) for c in split_topk_columns(projection.topk_order_by or ''))
+    return refs
+
+
+def discard_entry(mapping, key, value):
+    values = mapping.get(key)
+    if values is not None:
+        values.discard(value)
+        if not values:
+            del mapping[key]
+
+
+class CatalogIndex():
+    def __init__(self):
+        self.tables = {}  # projection key -> (schema, table)
+        self.references = {}  # projection key -> [(role, column)]
+        self.by_table = defaultdict(set)  # (schema, table) -> {projection key}
+        self.by_table_name = defaultdict(set)  # table -> {projection key}, for lookups without a schema
+        self.by_column = defaultdict(set)  # column -> {(projection key, role)}
+        self.by_table_column = defaultdict(set)  # (schema, table, column) -> {(projection key, role)}
+        self.by_table_name_column = defaultdict(set)  # (table, column) -> {(projection key, role)}
+
+    def __len__(self):
+        return len(self.tables)
+
+    def __contains__(self, key):
+        return key in self.tables
+
+    @classmethod
+    def from_projections(cls, projections):
+        index = cls()
+        for projection in projections:
+            index.add(projection)
+        return index
+
+    def add(self, projection):
+        key = projection_key(projection)
+        self.add_references(key, (projection.from_schema, projection.from_table), projection_references(projection))
+        return key
+
+    def add_references(self, key, table, references):
+        if key in self.tables:
+            self.remove(key)
+        schema_table = table_key(*table)
+        self.tables[key] = table
+        self.references[key] = references
+        self.by_table[schema_table].add(key)
+        self.by_table_name[schema_table[1]].add(key)
+        for role, column in references:
+            col = name_key(column)
+            self.by_column[col].add((key, role))
+            self.by_table_column[schema_table + (col,)].add((key, role))
+            self.by_table_name_column[(schema_table[1], col)].add((key, role))
+
+    def remove(self, key):
+        table = self.tables.pop(key, None)
+        if table is None:
+            return False
+        schema_table = table_key(*table)
+        discard_entry(self.by_table, schema_table, key)
+        discard_entry(self.by_table_name, schema_table[1], key)
+        for role, column in self.references.pop(key):
+            col = name_key(column)
+            discard_entry(self.by_column, col, (key, role))
+            discard_entry(self.by_table_column, schema_table + (col,), (key, role))
+            discard_entry(self.by_table_name_column, (schema_table[1], col), (key, role))
+        return True
+
+    ##########################
+    ## LOOKUPS              ##
+
+    # Without a schema a table name matches the table in any schema, like the bare
+    # table names of bulk_rewrite.AnchorFilter; pass schema='' for tables without one
+
+    def projections_for_table(self, table, schema=None):
+        if schema is None:
+            return set(self.by_table_name.get(name_key(table), ()))
+        return set(self.by_table.get(table_key(schema, table), ()))
+
+    def column_references(self, column, table=None, schema=None):
+        if table is None:
+            return set(self.by_column.get(name_key(column), ()))
+        if schema is None:
+            return set(self.by_table_name_column.get((name_key(table), name_key(column)), ()))
+        return set(self.by_table_column.get(table_key(schema, table) + (name_key(column),), ()))
+
+    def projections_using_column(self, column, table=None, schema=None, roles=None):
+        return set(key for key, role in self.column_references(column, table, schema) if roles is None or role in roles)
+
+    ##########################
+    ## PERSISTENCE          ##
+
+    def save(self, path):
+        data = {
+            'version': INDEX_VERSION,
+            'projections': [
+                {'key': list(key), 'table': list(self.tables[key]), 'references': self.references[key]}
+                for key in self.tables
+            ],
+        }
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(data, f, separators=(',', ':'))
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path):
+        with open(path) as f:
+            data = json.load(f)
+        if data.get('version') != INDEX_VERSION:
+            raise ValueError('Unsupported index version {0!r} in {1}'.format(data.get('version'), path))
+        index = cls()
+        for entry in data['projections']:
+            references = [tuple(ref) for ref in entry['references']]
+            index.add_references(tuple(entry['key']), tuple(entry['table']), references)
+        return index
+
+
+def build_index(source, **settings):
+    return CatalogIndex.from_projections(proj.to_projection() for proj in iter_projections(source, **settings))
@@ -0,0 +1,140 @@
+import json
+import mmap
+import os
+
+from projection_parser.api import DEFAULT_OPTIONS, new_parser
+from projection_parser.dump_reader import BYTES_SYNTAX, iter_statement_spans
+from projection_parser.projection_parser import ProjParser, buddy_pattern, if_not_exists_pattern
+
+INDEX_VERSION = 1
+INDEX_SUFFIX = '.projidx'
+
+
+def projection_name_key(name, parser=None):
+    # (database, schema, basename, buddy), split the way ProjParser reads the create line
+    parser = parser or ProjParser()
+    name = if_not_exists_pattern.sub('', name)
+    buddy = None
+    buddy_match = buddy_pattern.search(name)
+    if buddy_match:
+        buddy = int(buddy_match.group(0)[2:])
+        name = name[:buddy_match.start()]
+    return parser.split_db_schema_obj(name) + (buddy,)
+
+
+class DumpIndex():
+    def __init__(self, dump_path, index_path=None):
+        self.dump_path = dump_path
+        self.index_path = index_path or dump_path + INDEX_SUFFIX
+        self.file = None
+        self.map = None
+        self.entries = {}  # (database, schema, basename, buddy) -> (offset, length)
+        self.signature = None  # (size, mtime_ns) of the dump when it was mapped
+        self.rebuilt = False
+
+    def __enter__(self):
+        self.open()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __contains__(self, key):
+        return self.normalize_key(key) in self.entries
+
+    def keys(self):
+        return self.entries.keys()
+
+    def open(self):
+        self.file = open(self.dump_path, 'rb')
+        stat = os.fstat(self.file.fileno())
+        self.signature = (stat.st_size, stat.st_mtime_ns)
+        # mmap cannot map an empty file
+        self.map = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ) if stat.st_size else b''
+        self.rebuilt = not self.load_index(stat)
+        if self.rebuilt:
+            self.build()
+            self.save_index(stat)
+
+    def close(self):
+        if isinstance(self.map, mmap.mmap):
+            self.map.close()
+        if self.file is not None:
+            self.file.close()
+        self.map = None
+        self.file = None
+        self.signature = None
+
+    def refresh(self):
+        # Reopens the dump when it changed on disk since it was mapped. The path is
+        # stat'ed rather than the open file, which a replaced dump no longer is.
+        # Returns True when the index had to be rebuilt.
+        stat = os.stat(self.dump_path)
+        if self.file is not None and (stat.st_size, stat.st_mtime_ns) == self.signature:
+            return False
+        self.close()
+        self.open()
+        return self.rebuilt
+
+    ##########################
+    ## INDEX FILE           ##
+
+    def load_index(self, stat):
+        try:
+            with open(self.index_path) as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return False
+        if data.get('version') != INDEX_VERSION or (data.get('size'), data.get('mtime_ns')) != (stat.st_size, stat.st_mtime_ns):
+            return False
+        self.entries = {tuple(entry[:4]): (entry[4], entry[5]) for entry in data['entries']}
+        return True
+
+    def save_index(self, stat):
+        data = {
+            'version': INDEX_VERSION,
+            'size': stat.st_size,
+            'mtime_ns': stat.st_mtime_ns,
+            'entries': [list(key) + list(span) for key, span in self.entries.items()],
+        }
+        tmp_path = self.index_path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(data, f, separators=(',', ':'))
+        os.replace(tmp_path, self.index_path)
+
+    def build(self):
+        buf = self.map
+        parser = ProjParser()
+        entries = {}
+        for start, end in iter_statement_spans(buf):
+            start = BYTES_SYNTAX.leading_noise_pattern.match(buf, start, end).end()
+            match = BYTES_SYNTAX.create_projection_pattern.match(buf, start, end)
+            if match is None:
+                continue
+            key = projection_name_key(match.group(1).decode('utf-8'), parser)
+            # The first definition wins, as it would for CREATE PROJECTION IF NOT EXISTS
+            entries.setdefault(key, (start, end - start))
+        self.entries = entries
+
+    ##########################
+    ## LOOKUPS              ##
+
+    def normalize_key(self, key):
+        if isinstance(key, str):
+            return projection_name_key(key)
+        return tuple(key)
+
+    def read_statement(self, key):
+        self.refresh()
+        offset, length = self.entries[self.normalize_key(key)]
+        # Slicing the map copies just this statement out of the page cache
+        return self.map[offset:offset + length].decode('utf-8')
+
+    def parse(self, key, options=DEFAULT_OPTIONS):
+        proj = new_parser(options)
+        proj.raw_proj = self.read_statement(key)
+        proj.parse_projection()
+        return proj
@@ -0,0 +1,202 @@
+import codecs
+import re
+from collections import namedtuple
+
+from projection_parser.lazy import LazyProjParser
+from projection_parser.projection_parser import ProjParser
+
+DEFAULT_CHUNK_SIZE = 1024 * 1024
+
+# The statement syntax the splitters look for, as str and as bytes. Every character in
+# it is ASCII, and UTF-8 never uses ASCII bytes inside a multibyte character, so byte
+# offsets found in an encoded dump always fall on statement boundaries.
+_INTERESTING = r"[;'\"]|--|/\*"  # characters that can change the state outside a quote or comment
+_LEADING_NOISE = r'\s*(?:(?:--[^\n]*(?:\n|$)|/\*.*?\*/)\s*)*'
+_CREATE_PROJECTION = r'\s*CREATE\s+PROJECTION\s+(?:IF\s+NOT\s+EXISTS\s+)?([^\s(/]+)'
+
+StatementSyntax = namedtuple('StatementSyntax', [
+    'interesting_pattern', 'leading_noise_pattern', 'create_projection_pattern',
+    'semicolon', 'line_comment', 'block_comment', 'newline', 'block_comment_end',
+])
+
+
+def build_syntax(literal):
+    # literal turns a str into the type being scanned
+    return StatementSyntax(
+        re.compile(literal(_INTERESTING)),
+        re.compile(literal(_LEADING_NOISE), re.DOTALL),
+        re.compile(literal(_CREATE_PROJECTION), re.IGNORECASE),
+        literal(';'),
+        literal('--'),
+        literal('/*'),
+        literal('\n'),
+        literal('*/'),
+    )
+
+
+TEXT_SYNTAX = build_syntax(str)
+BYTES_SYNTAX = build_syntax(lambda text: text.encode('ascii'))
+
+
+def scan_statement_ends(buf, pos, state, syntax=TEXT_SYNTAX):
+    # Returns the offsets of the statement ending ';' in buf from pos on, and the position
+    # and state (None, '--', '/*', or the open quote) to resume from when more text follows
+    ends = []
+    buf_len = len(buf)
+    while pos < buf_len:
+        if state is None:
+            match = syntax.interesting_pattern.search(buf, pos)
+            if not match:
+                # Keep the last character around, it may start a '--' or '/*'
+                pos = max(pos, buf_len - 1)
+                break
+            token = match.group(0)
+            idx = match.start()
+            if token == syntax.semicolon:
+                ends.append(idx)
+                pos = idx + 1
+            else:
+                state = token
+                pos = match.end()
+        elif state == syntax.line_comment:
+            idx = buf.find(syntax.newline, pos)
+            if idx < 0:
+                pos = buf_len
+                break
+            state = None
+            pos = idx + 1
+        elif state == syntax.block_comment:
+            idx = buf.find(syntax.block_comment_end, pos)
+            if idx < 0:
+                pos = max(pos, buf_len - 1)
+                break
+            state = None
+            pos = idx + 2
+        else:
+            # A doubled quote ('' or "") closes and reopens, which leaves the state unchanged
+            idx = buf.find(state, pos)
+            if idx < 0:
+                pos = buf_len
+                break
+            state = None
+            pos = idx + 1
+    return ends, pos, state
+
+
+class StatementSplitter():
+    def __init__(self):
+        self.buffer = ''
+        self.scan_pos = 0
+        self.state = None
+
+    def feed(self, chunk):
+        self.buffer = self.buffer + chunk
+        ends, self.scan_pos, self.state = scan_statement_ends(self.buffer, self.scan_pos, self.state)
+        statements = []
+        start = 0
+        for end in ends:
+            statements.append(self.buffer[start:end])
+            start = end + 1
+        if start:
+            self.buffer = self.buffer[start:]
+            self.scan_pos -= start
+        return statements
+
+    def close(self):
+        remainder = self.buffer
+        self.buffer = ''
+        self.scan_pos = 0
+        self.state = None
+        return [remainder] if remainder.strip() else []
+
+
+##########################
+## STATEMENT ITERATORS  ##
+
+def iter_chunks(source, chunk_size=DEFAULT_CHUNK_SIZE):
+    if isinstance(source, str):
+        with open(source, encoding='utf-8') as f:
+            yield from iter_chunks(f, chunk_size)
+        return
+
+    decoder = None
+    while True:
+        chunk = source.read(chunk_size)
+        if not chunk:
+            break
+        if isinstance(chunk, bytes):
+            if decoder is None:
+                decoder = codecs.getincrementaldecoder('utf-8')()
+            chunk = decoder.decode(chunk)
+        yield chunk
+    if decoder is not None:
+        tail = decoder.decode(b'', final=True)
+        if tail:
+            yield tail
+
+
+def iter_statements(source, chunk_size=DEFAULT_CHUNK_SIZE):
+    splitter = StatementSplitter()
+    for chunk in iter_chunks(source, chunk_size):
+        for statement in splitter.feed(chunk):
+            if statement.strip():
+                yield statement
+    yield from splitter.close()
+
+
+def iter_statement_spans(buf, syntax=BYTES_SYNTAX):
+    # (start, end) of every statement in a complete buffer, e.g. a memory mapped dump
+    ends = scan_statement_ends(buf, 0, None, syntax)[0]
+    start = 0
+    for end in ends:
+        yield start, end
+        start = end + 1
+    if start < len(buf):
+        yield start, len(buf)
+
+
+def strip_leading_noise(statement):
+    return statement[TEXT_SYNTAX.leading_noise_pattern.match(statement).end():]
+
+
+def is_projection_statement(statement):
+    return TEXT_SYNTAX.create_projection_pattern.match(statement) is not None
+
+
+def iter_projection_statements(source, chunk_size=DEFAULT_CHUNK_SIZE):
+    for statement in iter_statements(source, chunk_size):
+        statement = strip_leading_noise(statement)
+        if is_projection_statement(statement):
+            yield statement
+
+
+def iter_projections(source, chunk_size=DEFAULT_CHUNK_SIZE, tab_space=None,
+                     table_name_with_column_name=None, if_not_exists=None, parse_cache=None,
+                     instrumentation=None, lazy=False, on_error=None):
+    # lazy=True yields LazyProjParser instances with only the header read, the
+    # clauses are parsed when first accessed. With on_error, a statement that fails
+    # to parse is passed to on_error(number, exception) and skipped instead of
+    # ending the iteration.
+    parser_class = LazyProjParser if lazy else ProjParser
+    for number, statement in enumerate(iter_projection_statements(source, chunk_size), 1):
+        proj = parser_class()
+        proj.parse_cache = parse_cache
+        proj.instrumentation = instrumentation
+        if tab_space is not None:
+            proj.tab_space = tab_space
+        if table_name_with_column_name is not None:
+            proj.table_name_with_column_name = table_name_with_column_name
+        if if_not_exists is not None:
+            proj.if_not_exists = if_not_exists
+        proj.raw_proj = statement
+        try:
+            if lazy:
+                proj.run_phase('parse.header', proj.parse_header)
+            else:
+                proj.parse_projection()
+        except Exception as e:
+            if on_error is None:
+                raise
+            on_error(number, e)
+            continue
+        yield proj
@@ -0,0 +1,39 @@
+import threading
+from collections import defaultdict, namedtuple
+
+PhaseTiming = namedtuple('PhaseTiming', ['calls', 'seconds'])
+
+
+class PhaseStats():
+    def __init__(self, callback=None):
+        self.callback = callback
+        self.calls = defaultdict(int)
+        self.seconds = defaultdict(float)
+        self.lock = threading.Lock()
+
+    def record(self, phase, seconds):
+        with self.lock:
+            self.calls[phase] += 1
+            self.seconds[phase] += seconds
+        if self.callback is not None:
+            self.callback(phase, seconds)
+
+    def snapshot(self):
+        with self.lock:
+            return {phase: PhaseTiming(self.calls[phase], self.seconds[phase]) for phase in self.calls}
+
+    def total_seconds(self, prefix=''):
+        with self.lock:
+            return sum(seconds for phase, seconds in self.seconds.items() if phase.startswith(prefix))
+
+    def reset(self):
+        with self.lock:
+            self.calls.clear()
+            self.seconds.clear()
+
+    def report(self):
+        lines = ['{0:<28} {1:>10} {2:>12} {3:>12}'.format('phase', 'calls', 'total ms', 'mean us')]
+        for phase, timing in sorted(self.snapshot().items()):
+            lines.append('{0:<28} {1:>10} {2:>12.3f} {3:>12.3f}'.format(
+                phase, timing.calls, timing.seconds * 1000, timing.seconds * 1e6 / timing.calls))
+        return '\n'.join(lines)
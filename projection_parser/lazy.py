@@ -0,0 +1,151 @@
+from projection_parser.classifier import LAP, SEGMENTED, TOPK, UNSEGMENTED, index_top_level_keywords, projection_kind, scan_layout
+from projection_parser.lexer import TokenCursor, tokenize
+from projection_parser.projection_parser import ProjParser
+
+# Clauses parsed on first access of one of their fields. Until then the fields keep
+# the defaults set by reset_parse_state, which are also their values when the clause
+# is missing from the statement.
+LAZY_CLAUSES = {
+    'column_list': ('projection_col_list',),
+    'select_list': ('select_list',),
+    'from_clause': ('from_database', 'from_schema', 'from_table'),
+    'group_by': ('group_by_columns',),
+    'order_by': ('order_by_list',),
+    'segmentation': ('modularhash', 'segment_columns'),
+    'ksafe_offset': ('ksafe', 'offset'),
+    'topk': ('topk_limit', 'topk_partition', 'topk_order_by'),
+}
+LAZY_FIELDS = tuple(field for fields in LAZY_CLAUSES.values() for field in fields)
+
+# Clauses that can appear in each kind of projection, after the column and select lists
+KIND_CLAUSES = {
+    SEGMENTED: ('column_list', 'select_list', 'from_clause', 'order_by', 'segmentation', 'ksafe_offset'),
+    UNSEGMENTED: ('column_list', 'select_list', 'from_clause', 'order_by', 'ksafe_offset'),
+    LAP: ('column_list', 'select_list', 'from_clause', 'group_by', 'segmentation', 'ksafe_offset'),
+    TOPK: ('column_list', 'select_list', 'topk', 'ksafe_offset'),
+}
+
+
+def lazy_field(field):
+    def get_field(self):
+        clause = self.pending_fields.get(field)
+        if clause is not None:
+            self.load_clause(clause)
+        return self.__dict__[field]
+
+    def set_field(self, value):
+        # Load first so that a later load of the same clause does not overwrite the value
+        clause = self.pending_fields.get(field)
+        if clause is not None:
+            self.load_clause(clause)
+        self.__dict__[field] = value
+
+    return property(get_field, set_field)
+
+
+class LazyProjParser(ProjParser):
+    def __init__(self):
+        self.pending_fields = {}  # field -> clause still to be parsed
+        self.layout = None
+        self.tail_cursor = None
+        self.tail_keywords = {}
+        super().__init__()
+
+    def parse_clauses(self):
+        self.run_phase('parse.header', self.parse_header)
+        self.proj_parts = self.raw_proj
+
+    def parse_header(self):
+        # Name, create type and kind are read right away, the clauses when first used
+        self.pending_fields = {}
+        self.reset_parse_state()
+        text = self.raw_proj
+        self.layout = column_start, column_end, from_start, has_calls = scan_layout(text)
+
+        tokens, self.hints = tokenize(text, 0, column_start)
+        self.cursor = TokenCursor(text, tokens, 0, column_start)
+        self.set_hints()
+        self.set_properties_from_create_line()
+        if not self.cursor.at_end():
+            raise ValueError("Expected '(' at {0}".format(self.cursor.describe_position()))
+
+        self.tail_cursor = TokenCursor(text, tokenize(text, from_start)[0], from_start)
+        self.tail_keywords = index_top_level_keywords(self.tail_cursor.tokens)
+        self.projection_kind = projection_kind(self.tail_cursor.tokens, self.tail_keywords)
+        self.is_topk = self.projection_kind == TOPK
+        self.is_lap = has_calls
+        if self.is_topk or 'UNSEGMENTED' in self.tail_keywords:
+            self.segmentation_spec = False
+        else:
+            self.segmentation_spec = 'SEGMENTED' in self.tail_keywords or None
+
+        pending_fields = {}
+        for clause in KIND_CLAUSES[self.projection_kind]:
+            pending_fields.update(dict.fromkeys(LAZY_CLAUSES[clause], clause))
+        if self.is_topk:
+            # The Top-K clause is read together with the FROM clause it follows
+            pending_fields.update(dict.fromkeys(LAZY_CLAUSES['from_clause'], 'topk'))
+        self.pending_fields = pending_fields
+
+    def is_parsed(self, field):
+        return field not in self.pending_fields
+
+    def load_clause(self, clause):
+        for field in [f for f, c in self.pending_fields.items() if c == clause]:
+            del self.pending_fields[field]
+        self.run_phase('parse.' + clause, getattr(self, 'load_' + clause))
+
+    def load_all(self):
+        while self.pending_fields:
+            self.load_clause(next(iter(self.pending_fields.values())))
+
+    def load_projection(self, projection):
+        # Every field is replaced, nothing is left to parse from the statement
+        self.pending_fields = {}
+        super().load_projection(projection)
+
+    def tail_at(self, *keywords):
+        # Positions the tail cursor on the first of the keywords present, or at the end
+        cursor = self.cursor = self.tail_cursor
+        positions = [self.tail_keywords[k] for k in keywords if k in self.tail_keywords]
+        cursor.pos = min(positions) if positions else len(cursor.tokens)
+        cursor.last_end = cursor.tokens[cursor.pos - 1].end if cursor.pos else self.layout[2]
+        return bool(positions)
+
+    def load_column_list(self):
+        start, end = self.layout[0], self.layout[1]
+        self.cursor = TokenCursor(self.raw_proj, tokenize(self.raw_proj, start, end)[0], start, end)
+        self.set_projection_col_list()
+
+    def load_select_list(self):
+        start, end = self.layout[1], self.layout[2] + len('FROM')
+        self.cursor = TokenCursor(self.raw_proj, tokenize(self.raw_proj, start, end)[0], start, end)
+        self.set_select_list()
+
+    def load_from_clause(self):
+        self.tail_at('FROM')
+        self.set_from_clause()
+
+    def load_group_by(self):
+        if self.tail_at('GROUP'):
+            self.set_group_by_list()
+
+    def load_order_by(self):
+        if self.tail_at('ORDER'):
+            self.set_order_by_list()
+
+    def load_segmentation(self):
+        if self.tail_at('SEGMENTED'):
+            self.set_segmentation_parts()
+
+    def load_ksafe_offset(self):
+        if self.tail_at('KSAFE', 'OFFSET'):
+            self.set_ksafe_offset()
+
+    def load_topk(self):
+        self.tail_at('FROM')
+        self.set_topk_properties()
+
+
+for _field in LAZY_FIELDS:
+    setattr(LazyProjParser, _field, lazy_field(_field))
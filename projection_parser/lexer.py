@@ -0,0 +1,217 @@
+import re
+from collections import namedtuple
+
+KEYWORD = 'keyword'
+OP = 'op'
+QUOTED = 'quoted'
+HINT = 'hint'
+
+# Only the words and characters that delimit clauses are tokens. Everything between two
+# tokens (names, column modifiers, commas) is read as a text span by the clause parsers.
+# Quoted identifiers and strings are tokens so that nothing inside them is split on.
+KEYWORDS = (
+    'CREATE',
+    'PROJECTION',
+    'AS',
+    'SELECT',
+    'FROM',
+    'GROUP',
+    'ORDER',
+    'BY',
+    'SEGMENTED',
+    'UNSEGMENTED',
+    'KSAFE',
+    'OFFSET',
+    'LIMIT',
+    'OVER',
+    'PARTITION',
+)
+
+Token = namedtuple('Token', ['kind', 'value', 'upper', 'start', 'end'])
+
+
+def build_token_pattern(keywords):
+    first_chars = ''.join(sorted(set(k[0] for k in keywords) | set(k[0].lower() for k in keywords)))
+    # The leading lookahead lets the regex engine skip most characters without trying each alternative
+    return re.compile(r'''(?=[/"'();\-{0}])(?:
+        (/\*\+.*?\*/)
+      | (/\*.*?\*/|--[^\n]*)
+      | ("(?:[^"]|"")*"|'(?:[^']|'')*')
+      | ([();])
+      | (?<![\w.$"])({1})(?![\w.$"])
+    )'''.format(first_chars, '|'.join(keywords)), re.VERBOSE | re.DOTALL | re.IGNORECASE)
+
+
+_token_pattern = build_token_pattern(KEYWORDS)
+_comment_pattern = re.compile(r'/\*.*?\*/|--[^\n]*', re.DOTALL)
+_group_kinds = (None, HINT, None, QUOTED, OP, KEYWORD)
+
+
+def strip_comments(text):
+    return _comment_pattern.sub(' ', text)
+
+
+def split_gap(gap):
+    # Comments lie entirely inside one gap, so they can be removed before splitting on commas
+    if '/*' in gap or '--' in gap:
+        gap = strip_comments(gap)
+    return gap.split(',')
+
+
+def tokenize(text, start=0, end=None):
+    tokens = []
+    hints = []
+    append = tokens.append
+    for match in _token_pattern.finditer(text, start, len(text) if end is None else end):
+        kind = _group_kinds[match.lastindex]
+        if kind is None:
+            continue
+        value = match.group()
+        token = Token(kind, value, value.upper(), match.start(), match.end())
+        if kind == HINT:
+            hints.append(token)
+        else:
+            append(token)
+    return tokens, hints
+
+
+class TokenCursor():
+    def __init__(self, text, tokens, start=0, end=None):
+        # start/end bound the text spans read when the tokens cover only part of the text
+        self.text = text
+        self.tokens = tokens
+        self.pos = 0
+        self.last_end = start
+        self.end = len(text) if end is None else end
+
+    def at_end(self):
+        return self.pos >= len(self.tokens)
+
+    def peek(self, ahead=0):
+        idx = self.pos + ahead
+        if idx < len(self.tokens):
+            return self.tokens[idx]
+        return None
+
+    def advance(self):
+        self.last_end = self.tokens[self.pos].end
+        self.pos += 1
+
+    def at_keywords(self, *words):
+        tokens = self.tokens
+        if self.pos + len(words) > len(tokens):
+            return False
+        for offset, word in enumerate(words):
+            token = tokens[self.pos + offset]
+            if token.kind != KEYWORD or token.upper != word:
+                return False
+        return True
+
+    def accept_keywords(self, *words):
+        if self.at_keywords(*words):
+            self.pos += len(words)
+            self.last_end = self.tokens[self.pos - 1].end
+            return True
+        return False
+
+    def expect_keywords(self, *words):
+        if not self.accept_keywords(*words):
+            raise ValueError('Expected {0} at {1}'.format(' '.join(words), self.describe_position()))
+
+    def at_op(self, op):
+        token = self.peek()
+        return token is not None and token.kind == OP and token.value == op
+
+    def accept_op(self, op):
+        if self.at_op(op):
+            self.advance()
+            return True
+        return False
+
+    def expect_op(self, op):
+        if not self.accept_op(op):
+            raise ValueError("Expected '{0}' at {1}".format(op, self.describe_position()))
+
+    def read_text(self):
+        # Text up to the next keyword or operator, quoted identifiers included
+        text = self.text
+        tokens = self.tokens
+        pos = self.pos
+        while pos < len(tokens) and tokens[pos].kind == QUOTED:
+            pos += 1
+        end = tokens[pos].start if pos < len(tokens) else self.end
+        span = text[self.last_end:end]
+        self.pos = pos
+        self.last_end = end
+        return strip_comments(span) if '/*' in span or '--' in span else span
+
+    def read_name(self):
+        name = self.read_text().strip()
+        if not name:
+            raise ValueError('Expected a name at {0}'.format(self.describe_position()))
+        return name
+
+    def read_word(self):
+        words = self.read_text().split()
+        return words[0] if words else None
+
+    def read_list(self, stop_words=()):
+        # Split on top level commas until a stop keyword, ';' or an unbalanced ')'.
+        # Commas are not tokens, so the text between two tokens is split with str.split.
+        items = []
+        pending = []
+        text = self.text
+        tokens = self.tokens
+        gap_start = self.last_end
+        depth = 0
+        group_start = 0
+        pos = self.pos
+        end = len(tokens)
+        stop = self.end
+        while pos < end:
+            token = tokens[pos]
+            kind = token.kind
+            if depth == 0:
+                if kind == OP and token.value != '(' or kind == KEYWORD and token.upper in stop_words:
+                    stop = token.start
+                    break
+                pieces = split_gap(text[gap_start:token.start])
+                pending.append(pieces[0])
+                if len(pieces) > 1:
+                    items.append(''.join(pending))
+                    items.extend(pieces[1:-1])
+                    pending = [pieces[-1]]
+                if kind == OP:
+                    depth = 1
+                    group_start = token.start
+                else:
+                    pending.append(token.value)
+                gap_start = token.end
+            elif kind == OP:
+                if token.value == '(':
+                    depth += 1
+                elif token.value == ')':
+                    depth -= 1
+                    if depth == 0:
+                        pending.append(text[group_start:token.end])
+                        gap_start = token.end
+                else:
+                    stop = token.start
+                    break
+            pos += 1
+        pieces = split_gap(text[gap_start:stop])
+        pending.append(pieces[0])
+        items.append(''.join(pending))
+        items.extend(pieces[1:])
+        items = [item.strip() for item in items]
+        if len(items) == 1 and not items[0]:
+            items = []
+        self.pos = pos
+        self.last_end = stop
+        return items
+
+    def describe_position(self):
+        token = self.peek()
+        if token is None:
+            return 'end of statement'
+        return "'{0}' (offset {1})".format(token.value, token.start)
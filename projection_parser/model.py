@@ -0,0 +1,93 @@
+import sys
+from collections import namedtuple
+
+
+def intern_str(value):
+    if value is None:
+        return None
+    return sys.intern(value)
+
+
+def intern_all(values):
+    return tuple(intern_str(v) for v in values)
+
+
+# The parser builds these records itself, with their strings already interned, so a
+# Projection shares them instead of copying every column
+ProjectionColumn = namedtuple('ProjectionColumn', ['col_name', 'encoding', 'accessrank'], defaults=(None, None))
+
+SelectColumn = namedtuple('SelectColumn', ['col_name', 'agg_func', 'col_alias'], defaults=(None, None))
+
+
+PROJECTION_FIELDS = (
+    'projection_database',
+    'projection_schema',
+    'projection_basename',
+    'projection_name',
+    'buddy',
+    'create_type',
+    'projection_col_list',
+    'select_list',
+    'from_database',
+    'from_schema',
+    'from_table',
+    'group_by_columns',
+    'order_by_list',
+    'segmentation_spec',
+    'modularhash',
+    'segment_columns',
+    'offset',
+    'ksafe',
+    'is_lap',
+    'is_topk',
+    'topk_limit',
+    'topk_partition',
+    'topk_order_by',
+)
+
+# Fields holding identifiers that repeat across a catalog
+INTERNED_FIELDS = (
+    'projection_database',
+    'projection_schema',
+    'projection_basename',
+    'projection_name',
+    'create_type',
+    'from_database',
+    'from_schema',
+    'from_table',
+)
+
+
+class Projection(namedtuple('Projection', PROJECTION_FIELDS)):
+    __slots__ = ()
+
+    @classmethod
+    def from_parser(cls, parser):
+        values = {}
+        for field in INTERNED_FIELDS:
+            values[field] = intern_str(getattr(parser, field, None))
+        values['buddy'] = parser.buddy
+        values['projection_col_list'] = tuple(parser.projection_col_list)
+        values['select_list'] = tuple(parser.select_list)
+        values['group_by_columns'] = intern_all(parser.group_by_columns)
+        values['order_by_list'] = intern_all(parser.order_by_list)
+        values['segmentation_spec'] = parser.segmentation_spec
+        values['modularhash'] = parser.modularhash
+        values['segment_columns'] = intern_all(parser.segment_columns)
+        values['offset'] = parser.offset
+        values['ksafe'] = parser.ksafe
+        values['is_lap'] = parser.is_lap
+        values['is_topk'] = parser.is_topk
+        values['topk_limit'] = parser.topk_limit
+        values['topk_partition'] = parser.topk_partition
+        values['topk_order_by'] = parser.topk_order_by
+        return cls(**values)
+
+    def apply_to_parser(self, parser):
+        for field in PROJECTION_FIELDS:
+            setattr(parser, field, getattr(self, field))
+        parser.projection_col_list = list(self.projection_col_list)
+        parser.select_list = list(self.select_list)
+        parser.group_by_columns = list(self.group_by_columns)
+        parser.order_by_list = list(self.order_by_list)
+        parser.segment_columns = list(self.segment_columns)
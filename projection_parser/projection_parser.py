@@ -1,13 +1,91 @@
 import re
+import sys
+import time
+
+from projection_parser.classifier import LAP, SEGMENTED, TOPK, UNSEGMENTED, classify_tokens
+from projection_parser.lexer import TokenCursor, tokenize
+from projection_parser.model import Projection, ProjectionColumn, SelectColumn, intern_str
+
+# Bump when a parsing change alters the Projection produced for the same DDL
+PARSER_VERSION = 3
+
+as_pattern = re.compile(r'\sAS\s', re.IGNORECASE)
+if_not_exists_pattern = re.compile(r'^IF\s+NOT\s+EXISTS\s', re.IGNORECASE)
+buddy_pattern = re.compile(r'_b\d$', re.IGNORECASE)
+comment_start_pattern = re.compile(r'^/\*\+')
+comment_end_pattern = re.compile(r'\*/$')
+createtype_pattern = re.compile('createtype', re.IGNORECASE)
+create_type_paren_pattern = re.compile(r'createtype\(', re.IGNORECASE)
+# Builds a column record without the Python level __new__ of a namedtuple, which
+# would otherwise be paid once per column of a wide projection
+new_record = tuple.__new__
+
+# A column name at the start of a list item; quoted names may contain spaces
+leading_name_pattern = re.compile(r'(?:"(?:[^"]|"")*"|[^\s"])+')
+
+# Keywords that end a column list after the FROM clause
+CLAUSE_KEYWORDS = ('ORDER', 'GROUP', 'SEGMENTED', 'UNSEGMENTED', 'KSAFE', 'OFFSET', 'LIMIT')
+
+# Fields each compiled section is built from. A section is only regenerated by
+# recompile_projection when one of its fields changed since that section was last compiled.
+SECTION_DEPENDENCIES = {
+    'create_line': ('if_not_exists', 'projection_database', 'projection_schema', 'projection_basename', 'create_type'),
+    'projection_columns': ('projection_col_list', 'order_by_list', 'tab_space'),
+    'select_columns': ('select_list', 'order_by_list', 'tab_space'),
+    'from_clause': ('from_database', 'from_schema', 'from_table'),
+    'group_by_clause': ('select_list', 'tab_space'),
+    'limit_part_order': ('topk_limit', 'topk_partition', 'topk_order_by'),
+    'order_by_clause': ('order_by_list', 'tab_space'),
+    'segment_clause': ('segmentation_spec', 'modularhash', 'segment_columns', 'table_name_with_column_name'),
+}
+# Parse routine for each projection kind, see classifier.projection_kind
+KIND_ROUTINES = {
+    SEGMENTED: 'parse_segmented_clauses',
+    UNSEGMENTED: 'parse_unsegmented_clauses',
+    LAP: 'parse_lap_clauses',
+    TOPK: 'parse_topk_clauses',
+}
+
+
+def field_snapshot(value):
+    # Lists are edited in place, so the snapshot is a copy that is later compared by value.
+    # Their items are strings or immutable column records, a shallow copy is enough.
+    if isinstance(value, list):
+        return list(value)
+    return value
+
 
 class ProjParser():
     def __init__(self):
-        self.recompiled_projection = None
         self.raw_proj = None
+        self.reset_parse_state()
+
+        # Style settings
+        self.tab_space = ' '*2
+        self.table_name_with_column_name = False
+        self.if_not_exists = True
+
+        # Optional ParseCache consulted by parse_projection
+        self.parse_cache = None
+
+        # Optional PhaseStats recording time spent in each parse/recompile phase
+        self.instrumentation = None
+
+        # Incremental recompile state
+        self.compiled_sections = {}
+        self.compiled_snapshots = {}
+
+    def reset_parse_state(self):
+        # Everything parse_clauses fills in; called before each parse so a reused
+        # instance does not carry columns or flags over from the previous statement
+        self.recompiled_projection = None
         self.proj_parts = self.raw_proj
+        self.cursor = None
+        self.hints = []
         self.projection_database = None
         self.projection_schema = None
         self.projection_basename = None
+        self.projection_name = None
         self.buddy = None
         self.create_type = None
         self.projection_col_list = []
@@ -17,13 +95,14 @@ class ProjParser():
         self.from_schema = None
         self.from_table = None
         self.order_by_list = []
-        self.segmentation_spec = False  # False = UNSEGMENTED; True = SEGEMENTED
+        self.segmentation_spec = False  # None = no segmentation clause; False = UNSEGMENTED; True = SEGEMENTED
         self.modularhash = None  # False = HASH; True = MODULARHASH
         self.segment_columns = []
         self.group_by_columns = []
         self.offset = None
         self.ksafe = None
         self.is_lap = False
+        self.projection_kind = None
 
         # Topk Properties
         self.is_topk = False
@@ -31,60 +110,98 @@ class ProjParser():
         self.topk_partition = ''
         self.topk_order_by = ''
 
-        # Style settings
-        self.tab_space = ' '*2
-        self.table_name_with_column_name = False
-        self.if_not_exists = True
-
 
     ######################
     ## PARSE PROJECTION ##
     def parse_projection(self):
-        self.initial_sanitation()
-        self.set_properties_from_create_line()
-        self.set_projection_col_list()
-        self.set_select_list()
-        self.is_topk = self.is_projection_topk()
-        if self.is_topk:
-            self.set_topk_properties()
-            self.set_ksafe_offset()
-        else:
-            self.set_from_clause()
-            self.set_order_by_list()
-            self.set_segmentation_clause()
-            self.proj_parts = self.raw_proj
+        if self.parse_cache is not None:
+            return self.parse_cache.parse(self)
+        self.parse_clauses()
+        return self.to_projection()
+
+    def parse_clauses(self):
+        self.reset_parse_state()
+        phase = self.run_phase
+        phase('parse.tokenize', self.initial_sanitation)
+        phase('parse.hints', self.set_hints)
+        phase('parse.create_line', self.set_properties_from_create_line)
+        phase('parse.column_list', self.set_projection_col_list)
+        phase('parse.select_list', self.set_select_list)
+        phase('parse.classify', self.classify_projection)
+        self.is_topk = self.projection_kind == TOPK
+        getattr(self, KIND_ROUTINES[self.projection_kind])()
+        self.proj_parts = self.raw_proj
+
+    def classify_projection(self):
+        # Every kind differs only after the select list, so only the tokens from FROM on are scanned
+        self.projection_kind = classify_tokens(self.cursor.tokens, self.cursor.pos)[0]
+
+    # Each routine only reads the clauses that can follow the select list in its kind
+
+    def parse_segmented_clauses(self):
+        phase = self.run_phase
+        phase('parse.from_clause', self.set_from_clause)
+        phase('parse.order_by', self.set_order_by_list)
+        self.segmentation_spec = None
+        phase('parse.segmentation', self.set_segmentation_parts)
+        phase('parse.ksafe_offset', self.set_ksafe_offset)
+
+    def parse_unsegmented_clauses(self):
+        phase = self.run_phase
+        phase('parse.from_clause', self.set_from_clause)
+        phase('parse.order_by', self.set_order_by_list)
+        phase('parse.ksafe_offset', self.set_ksafe_offset)
+
+    def parse_lap_clauses(self):
+        # Live aggregate projections are sorted by their GROUP BY, they have no ORDER BY
+        phase = self.run_phase
+        phase('parse.from_clause', self.set_from_clause)
+        phase('parse.group_by', self.set_group_by_list)
+        phase('parse.segmentation', self.set_segmentation_clause)
+
+    def parse_topk_clauses(self):
+        phase = self.run_phase
+        phase('parse.topk', self.set_topk_properties)
+        phase('parse.ksafe_offset', self.set_ksafe_offset)
+
+    def run_phase(self, phase, func):
+        if self.instrumentation is None:
+            return func()
+        start = time.perf_counter()
+        try:
+            return func()
+        finally:
+            self.instrumentation.record(phase, time.perf_counter() - start)
+
+    def to_projection(self):
+        return Projection.from_parser(self)
+
+    def load_projection(self, projection):
+        self.reset_parse_state()
+        projection.apply_to_parser(self)
 
     def initial_sanitation(self):
-        self.proj_parts = self.raw_proj.strip()
-        if self.proj_parts.endswith(';'):
-            self.proj_parts = self.proj_parts[:-1]
-        while '  ' in self.proj_parts:
-            self.proj_parts = self.proj_parts.replace('  ', ' ')
+        self.proj_parts = self.raw_proj
+        tokens, self.hints = tokenize(self.raw_proj)
+        self.cursor = TokenCursor(self.raw_proj, tokens)
+
+    def set_hints(self):
+        if self.hints:
+            self.parse_hints(self.hints[0].value)
 
     def set_properties_from_create_line(self):
-        script = self.proj_parts
-        hint_pattern = '\/\*.*\*\/'
-        hint_search_result = re.search(hint_pattern, script)
-        if hint_search_result:
-            hint = hint_search_result.group(0)
-            self.parse_hints(hint)
-            self.proj_parts = re.sub(hint_pattern, '', script)
-        create_line = self.proj_parts.split('(')[0].strip()
-        create_projection_pattern = re.compile('CREATE PROJECTION ', re.IGNORECASE)
-        if_not_exists_pattern = re.compile('IF NOT EXISTS ', re.IGNORECASE)
-        create_line = re.sub(create_projection_pattern, '', create_line)
-        create_line = re.sub(if_not_exists_pattern, '', create_line)
-        projection_name = create_line.strip()
+        cursor = self.cursor
+        cursor.expect_keywords('CREATE', 'PROJECTION')
+        projection_name = if_not_exists_pattern.sub('', cursor.read_name())
 
         db, sch, proj = self.split_db_schema_obj(projection_name)
 
         self.projection_name = proj
 
-        buddy_pattern = '\_b\d$'
-        bx_search_result = re.search(buddy_pattern, projection_name, re.IGNORECASE)
+        bx_search_result = buddy_pattern.search(projection_name)
         if bx_search_result:
             buddy_text = bx_search_result.group(0)
-            projection_name = re.sub(buddy_pattern, '', projection_name)
+            projection_name = projection_name[:bx_search_result.start()]
             try:
                 self.buddy = int(buddy_text[2:])
             except:
@@ -100,10 +217,8 @@ class ProjParser():
         self.set_hint_parts(hints)
 
     def get_hint_list(self, hint):
-        comment_start_pattern = '^\/\*\+'
-        comment_end_pattern = '\*\/$'
-        hint = re.sub(comment_start_pattern, '', hint)
-        hint = re.sub(comment_end_pattern, '', hint)
+        hint = comment_start_pattern.sub('', hint)
+        hint = comment_end_pattern.sub('', hint)
         if ',' in hint:
             return hint.split(',')
         else:
@@ -112,80 +227,78 @@ class ProjParser():
     def set_hint_parts(self, hints):
         for hint in hints:
             hint = hint.strip()
-            if re.search('createtype', hint, re.IGNORECASE):
-                hint = re.sub('createtype', '', hint, re.IGNORECASE).strip()
+            if createtype_pattern.search(hint):
+                hint = createtype_pattern.sub('', hint).strip()
                 hint = hint.replace('(', '').replace(')', '')
                 self.create_type = hint.strip()
 
     def set_create_type(self, hint):
         hint = hint.replace('/*+', '').replace('/*', '').replace('*/', '').strip()
-        create_type_pattern = re.compile('createtype\(', re.IGNORECASE)
-        create_type_search_result = re.search(create_type_pattern, hint)
+        create_type_search_result = create_type_paren_pattern.search(hint)
         if create_type_search_result:
-            create_type = re.sub(create_type_pattern, '', hint).strip()
+            create_type = create_type_paren_pattern.sub('', hint).strip()
             create_type = create_type.split(')')[0].strip()
             self.create_type = create_type
 
     def set_projection_col_list(self):
-        projection_cols_split = self.proj_parts.split(')')
-        projection_cols_raw = projection_cols_split[0]
-        self.proj_parts = ')'.join(projection_cols_split[1:])
-        projection_cols_raw = projection_cols_raw.split('(')[1].strip()
-        projection_cols_raw_list = projection_cols_raw.split(',')
-        projection_cols_raw_list = list(map(lambda c: c.strip(), projection_cols_raw_list))
-
-        for c in projection_cols_raw_list:
-            proj_col_dict = {}
-            c_split = c.split(' ')
-            proj_col_dict['col_name'] = c_split[0]
-            proj_column_modifiers = ' '.join(c_split[1:]).strip().upper()
-            if 'ENCODING ' in proj_column_modifiers:
-                proj_col_dict['encoding'] = proj_column_modifiers.split('ENCODING ')[1].strip().split(' ')[0]
-            else:
-                proj_col_dict['encoding'] = None
-            if 'ACCESSRANK ' in proj_column_modifiers:
-                proj_col_dict['accessrank'] = int(proj_column_modifiers.split('ACCESSRANK ')[1].strip())
+        cursor = self.cursor
+        cursor.expect_op('(')
+        projection_col_list = []
+        for c in cursor.read_list():
+            if '"' in c:
+                col_name = leading_name_pattern.match(c.lstrip()).group(0)
+                c_split = [col_name] + c.lstrip()[len(col_name):].split()
             else:
-                proj_col_dict['accessrank'] = None
-            self.projection_col_list.append(proj_col_dict)
+                c_split = c.split()
+            encoding = None
+            accessrank = None
+            for i in range(1, len(c_split) - 1):
+                modifier = c_split[i].upper()
+                if modifier == 'ENCODING':
+                    encoding = sys.intern(c_split[i + 1].upper())
+                elif modifier == 'ACCESSRANK':
+                    accessrank = int(c_split[i + 1])
+            projection_col_list.append(new_record(ProjectionColumn, (sys.intern(c_split[0]), encoding, accessrank)))
+        cursor.expect_op(')')
+        self.projection_col_list = projection_col_list
 
     def remove_table_from_col(self, col):
-        if len(col.split(".")) > 1:
-            col = col.split(".")[1]
+        if '.' in col:
+            col = col.rsplit('.', 1)[1]
         return col
 
     def set_select_list(self):
-        select_parts, self.proj_parts = re.split('\sFROM\s', self.proj_parts.strip(), re.IGNORECASE)
-        select_parts = re.split('\sSELECT\s', select_parts, re.IGNORECASE)[1]
-        self.select_list = list(map(lambda s: self.parser_select_parts(s), select_parts.split(',')))
+        cursor = self.cursor
+        cursor.expect_keywords('AS', 'SELECT')
+        self.select_list = list(map(lambda s: self.parser_select_parts(s), cursor.read_list(('FROM',))))
 
     def parser_select_parts(self, column):
-        select_column_dict = {}
+        agg_func = None
+        col_alias = None
 
-        column = column.strip()
-        column = re.split('\sAS\s', column, re.IGNORECASE)
+        if ' ' in column or '\n' in column:
+            column = as_pattern.split(' '.join(column.split()), 1)
+        else:
+            column = [column]
         if '(' in column[0]:
             self.is_lap = True
-            agg_func, col_name = column[0].split('(')
-            agg_func = agg_func.strip()
-            col_name = col_name.split(')')[0].strip()
-            select_column_dict['col_name'] = col_name
-            select_column_dict['agg_func'] = agg_func
+            agg_func, col_name = column[0].split('(', 1)
+            agg_func = intern_str(agg_func.strip())
+            col_name = col_name.rsplit(')', 1)[0].strip()
         else:
-            select_column_dict['col_name'] = column[0]
+            col_name = column[0]
 
         if not self.table_name_with_column_name:
-            select_column_dict['col_name'] = self.remove_table_from_col(select_column_dict['col_name'])
+            col_name = self.remove_table_from_col(col_name)
 
         if len(column) > 1:
-            col_alias = column[1].strip()
-            select_column_dict['col_alias'] = col_alias
+            col_alias = intern_str(column[1].strip())
 
-        return select_column_dict
+        return new_record(SelectColumn, (sys.intern(col_name), agg_func, col_alias))
 
     def set_from_clause(self):
-        from_parts, self.proj_parts = re.split('\sORDER BY\s', self.proj_parts.strip(), re.IGNORECASE)
-        self.set_from_parts(from_parts)
+        self.cursor.expect_keywords('FROM')
+        self.set_from_parts(self.cursor.read_name())
 
     def set_from_parts(self, from_parts):
         from_parts = from_parts.strip()
@@ -194,91 +307,82 @@ class ProjParser():
         self.from_schema = sch
         self.from_table = table
 
+    def set_group_by_list(self):
+        if self.cursor.accept_keywords('GROUP', 'BY'):
+            self.group_by_columns = self.get_item_names(self.cursor.read_list(CLAUSE_KEYWORDS))
+
     def set_order_by_list(self):
-        order_by_parts = self.proj_parts.strip()
-        segmented_pattern = '\sSEGMENTED\sBY\s'
-        seg_search_result = re.search(segmented_pattern, self.proj_parts.strip(), re.IGNORECASE)
-        if seg_search_result:
-            order_by_parts = re.split(segmented_pattern, order_by_parts, re.IGNORECASE)[0]
-        order_by_parts = order_by_parts.strip().split(',')
-        if not self.table_name_with_column_name:
-            order_by_parts = list(map(lambda o: self.remove_table_from_col(o), order_by_parts))
-        self.order_by_list = list(map(lambda o: re.split('\s', o.strip())[0], order_by_parts))
+        if self.cursor.accept_keywords('ORDER', 'BY'):
+            self.order_by_list = self.get_item_names(self.cursor.read_list(CLAUSE_KEYWORDS))
+
+    def get_item_names(self, items):
+        names = []
+        for item in items:
+            name = leading_name_pattern.match(item.lstrip()).group(0) if ' ' in item or '\n' in item else item
+            if not self.table_name_with_column_name:
+                name = self.remove_table_from_col(name)
+            names.append(name)
+        return names
 
     def set_segmentation_clause(self):
-        rep_pattern = '\sUNSEGMENTED\s'
-        rep_search_result = re.search(rep_pattern, self.proj_parts.strip(), re.IGNORECASE)
-        if not rep_search_result:
-            self.segmentation_spec = True
+        cursor = self.cursor
+        if not cursor.at_keywords('UNSEGMENTED'):
+            self.segmentation_spec = None
             self.set_segmentation_parts()
+        self.set_ksafe_offset()
 
     def set_segmentation_parts(self):
-        self.proj_parts = re.split('\sSEGMENTED BY\s', self.proj_parts, re.IGNORECASE)[1].strip()
-        self.set_hash_parts()
-        self.set_ksafe_offset()
+        if self.cursor.accept_keywords('SEGMENTED', 'BY'):
+            self.segmentation_spec = True
+            self.set_hash_parts()
 
     def set_hash_parts(self):
-        hash_search_result = re.search('HASH', self.proj_parts, re.IGNORECASE)
-        if hash_search_result:
-            hash_parts, self.proj_parts = self.proj_parts.split(')')
-            hash_type, segment_columns = hash_parts.split('(')
-            self.set_hash_type(hash_type)
-            self.set_segment_columns(segment_columns)
+        cursor = self.cursor
+        hash_type = cursor.read_text().strip()
+        if hash_type.upper() not in ('HASH', 'MODULARHASH') or not cursor.accept_op('('):
+            # Only hash segmentation can be rendered back
+            raise ValueError('Expected HASH(...) or MODULARHASH(...) after SEGMENTED BY, found {0!r}'.format(hash_type))
+        self.set_hash_type(hash_type)
+        self.set_segment_columns(self.get_item_names(cursor.read_list()))
+        cursor.expect_op(')')
 
     def set_hash_type(self, hash_type):
-        hash_type = hash_type.strip()
-        mod_hash_pattern = re.compile('^MODULARHASH$', re.IGNORECASE)
-        if mod_hash_pattern.match(hash_type):
+        hash_type = hash_type.strip().upper()
+        if hash_type == 'MODULARHASH':
             self.modularhash = True
-        else:
-            hash_pattern = re.compile('^HASH$', re.IGNORECASE)
-            if hash_pattern.match(hash_type):
-                self.modularhash = False
+        elif hash_type == 'HASH':
+            self.modularhash = False
 
     def set_segment_columns(self, segment_columns):
-        segment_columns = segment_columns.strip()
-        if ',' in segment_columns:
-            segment_columns_list = segment_columns.split(',')
-            if not self.table_name_with_column_name:
-                segment_columns_list = list(map(lambda c: self.remove_table_from_col(c), segment_columns_list))
-            self.segment_columns = list(map(lambda c: c.strip(), segment_columns_list))
-        else:
-            self.segment_columns.append(segment_columns)
+        self.segment_columns = segment_columns
 
     def set_ksafe_offset(self):
-        ksafe_pattern = re.compile('KSAFE\s', re.IGNORECASE)
-        ksafe_search_result = re.search(ksafe_pattern, self.proj_parts)
-        if ksafe_search_result:
-            ksafe_parts = re.split(ksafe_pattern, self.proj_parts)[1]
-            self.ksafe = int(ksafe_parts.split(' ')[0].strip())
-
-        offset_pattern = re.compile('OFFSET\s', re.IGNORECASE)
-        offset_search_result = re.search(offset_pattern, self.proj_parts)
-        if offset_search_result:
-            offset_parts = re.split(offset_pattern, self.proj_parts)[1]
-            self.offset = int(offset_parts.split(' ')[0].strip())
-
-    def is_projection_topk(self):
-        raw_proj_oneline = ''.join(self.raw_proj.split())
-        if 'over(partitionby' in raw_proj_oneline.lower():
-            return True
-        else:
-            return False
+        cursor = self.cursor
+        while not cursor.at_end():
+            if cursor.accept_keywords('KSAFE'):
+                # A bare KSAFE (system K-safety) has no value
+                word = cursor.read_word()
+                if word is not None:
+                    self.ksafe = int(word)
+            elif cursor.accept_keywords('OFFSET'):
+                word = cursor.read_word()
+                if word is not None:
+                    self.offset = int(word)
+            else:
+                cursor.advance()
 
     def set_topk_properties(self):
-        limit_pattern = re.compile('\sLIMIT\s\d+', re.IGNORECASE)
-        limit = re.search(limit_pattern, self.proj_parts).group(0)
-        from_parts, self.proj_parts = re.split(limit_pattern, self.proj_parts)
-        self.set_from_parts(from_parts)
-        self.topk_limit = limit.split()[1]
-        part_order_by_pattern = re.compile('\sORDER BY\s', re.IGNORECASE)
-        over_partition, order_by_parts = re.split(part_order_by_pattern, self.proj_parts)
-        partition_by_pattern = re.compile('\(\s*PARTITION\sBY\s', re.IGNORECASE)
-        part_clause = re.split(partition_by_pattern, over_partition)[1].strip()
-        self.parse_partition(part_clause)
-        end_over_paren_pattern = re.compile('\)', re.IGNORECASE)
-        topk_order_by, self.proj_parts = re.split(end_over_paren_pattern, order_by_parts)
-        self.parse_topk_order_by(topk_order_by)
+        cursor = self.cursor
+        self.set_from_clause()
+        cursor.expect_keywords('LIMIT')
+        self.topk_limit = cursor.read_word()
+        cursor.expect_keywords('OVER')
+        cursor.expect_op('(')
+        cursor.expect_keywords('PARTITION', 'BY')
+        self.parse_partition(cursor.read_list(('ORDER',)))
+        if cursor.accept_keywords('ORDER', 'BY'):
+            self.parse_topk_order_by(cursor.read_list())
+        cursor.expect_op(')')
 
     def parse_partition(self, partition_clause):
         col_list = self.get_col_names_only(partition_clause)
@@ -291,32 +395,72 @@ class ProjParser():
 
     ##########################
     ## RECOMPILE PROJECTION ##
-    def recompile_projection(self):
+    def recompile_projection(self, projection=None):
+        if projection is not None:
+            self.load_projection(projection)
         recompiled_projection_list = []
-        create_line = self.compile_create_line()
-        projection_columns = self.compile_projection_columns()
-        select_clause = self.compile_select_columns()
-        from_clause = self.compile_from_cluase()
+        create_line = self.compile_section('create_line', self.compile_create_line)
+        projection_columns = self.compile_section('projection_columns', self.compile_projection_columns)
+        select_clause = self.compile_section('select_columns', self.compile_select_columns)
+        from_clause = self.compile_section('from_clause', self.compile_from_cluase)
 
         recompiled_projection_list.append(create_line)
         recompiled_projection_list.append(projection_columns)
         recompiled_projection_list.append(select_clause)
         recompiled_projection_list.append(from_clause)
         if self.is_lap:
-            group_by_clause = self.compile_group_by_clause()
+            group_by_clause = self.compile_section('group_by_clause', self.compile_group_by_clause)
             recompiled_projection_list.append(group_by_clause)
             recompiled_projection_list.append('ALL NODES;')
         elif self.is_topk:
-            limit_part_order_line = self.compile_limit_part_order()
+            limit_part_order_line = self.compile_section('limit_part_order', self.compile_limit_part_order)
             recompiled_projection_list.append(limit_part_order_line)
             recompiled_projection_list.append('ALL NODES;')
         else:
-            order_by_clause = self.compile_order_by_clause()
-            segment_clause = self.compile_segment_clause()
-            recompiled_projection_list.append(order_by_clause)
-            recompiled_projection_list.append(segment_clause)
+            if self.order_by_list:
+                order_by_clause = self.compile_section('order_by_clause', self.compile_order_by_clause)
+                recompiled_projection_list.append(order_by_clause)
+            if self.segmentation_spec is None:
+                # Left out of the DDL, so it is left to Vertica's default here too
+                recompiled_projection_list[-1] += ';'
+            else:
+                segment_clause = self.compile_section('segment_clause', self.compile_segment_clause)
+                recompiled_projection_list.append(segment_clause)
 
         self.recompiled_projection = '\n'.join(recompiled_projection_list)
+        return self.recompiled_projection
+
+    def section_is_current(self, section):
+        # Each section keeps the values it was compiled from; sections skipped by a
+        # call (e.g. segment_clause for a Top-K projection) keep their older values
+        snapshot = self.compiled_snapshots.get(section)
+        if snapshot is None:
+            return False
+        for field, value in zip(SECTION_DEPENDENCIES[section], snapshot):
+            if getattr(self, field) != value:
+                return False
+        return True
+
+    def dirty_fields(self):
+        # Fields that differ from what at least one cached section was compiled from
+        dirty = set()
+        for section, fields in SECTION_DEPENDENCIES.items():
+            snapshot = self.compiled_snapshots.get(section)
+            if snapshot is None:
+                dirty.update(fields)
+            else:
+                dirty.update(f for f, value in zip(fields, snapshot) if getattr(self, f) != value)
+        return dirty
+
+    def compile_section(self, section, compile_func):
+        if section not in self.compiled_sections or not self.section_is_current(section):
+            self.compiled_sections[section] = self.run_phase('recompile.' + section, compile_func)
+            self.compiled_snapshots[section] = tuple(field_snapshot(getattr(self, f)) for f in SECTION_DEPENDENCIES[section])
+        return self.compiled_sections[section]
+
+    def invalidate_compiled_sections(self):
+        self.compiled_sections = {}
+        self.compiled_snapshots = {}
 
     def compile_create_line(self):
         create_line = 'CREATE PROJECTION '
@@ -340,9 +484,9 @@ class ProjParser():
         return projection_columns
 
     def format_projection_column(self, col, count):
-        column_str = self.tab_space + col['col_name']
-        column_str = column_str + ' ENCODING ' + col['encoding'] if col['encoding'] else column_str
-        column_str = column_str + ' ACCESSRANK ' + str(col['accessrank']) if col['accessrank'] else column_str
+        column_str = self.tab_space + col.col_name
+        column_str = column_str + ' ENCODING ' + col.encoding if col.encoding else column_str
+        column_str = column_str + ' ACCESSRANK ' + str(col.accessrank) if col.accessrank else column_str
         column_str = column_str + ',' if count < len(self.sorted_projection_col_list) else column_str
         return column_str
 
@@ -359,28 +503,26 @@ class ProjParser():
         return select_columns
 
     def order_select_columns(self, select_list):
+        columns_by_name = {}
+        for sel_col in select_list:
+            columns_by_name.setdefault(sel_col.col_name, []).append(sel_col)
+
         ordered_list = []
-        remaining_list = []
         for ob_col in self.order_by_list:
-            for sel_col in select_list:
-                if sel_col['col_name'] == ob_col:
-                    ordered_list.append(sel_col)
+            ordered_list.extend(columns_by_name.get(ob_col, ()))
 
-        remaining_list = select_list
-        for ob_col in ordered_list:
-            for i in range(len(remaining_list) -1, -1, -1):
-                if ob_col['col_name'] == remaining_list[i]['col_name']:
-                    del remaining_list[i]
+        order_by_names = set(self.order_by_list)
+        remaining_list = [sel_col for sel_col in select_list if sel_col.col_name not in order_by_names]
 
         return ordered_list + remaining_list
 
-    def format_string_column(self, col_dict):
-        if 'agg_func' in col_dict.keys():
-            col_name = '{0}({1})'.format(col_dict['agg_func'].upper(), col_dict['col_name'])
+    def format_string_column(self, col):
+        if col.agg_func is not None:
+            col_name = '{0}({1})'.format(col.agg_func.upper(), col.col_name)
         else:
-            col_name = col_dict['col_name']
-        if 'col_alias' in col_dict.keys():
-            col_name = '{0} AS {1}'.format(col_name, col_dict['col_alias'])
+            col_name = col.col_name
+        if col.col_alias is not None:
+            col_name = '{0} AS {1}'.format(col_name, col.col_alias)
         return col_name
 
     def format_column_list(self, col_name_list, delim, indent_cnt):
@@ -400,7 +542,7 @@ class ProjParser():
         return from_clause
 
     def compile_group_by_clause(self):
-        group_by_column_list = list(filter(None, map(lambda c: c['col_name'] if not 'agg_func' in c else None, self.select_list)))
+        group_by_column_list = list(filter(None, map(lambda c: c.col_name if c.agg_func is None else None, self.select_list)))
         group_by_columns = self.format_column_list(group_by_column_list, '\n', 2)
 
         group_by_section = self.tab_space + 'GROUP BY\n{}'.format(group_by_columns)
@@ -424,6 +566,8 @@ class ProjParser():
             return segment_clause
 
     def compile_segment_parts(self):
+        if self.modularhash is None or not self.segment_columns:
+            raise ValueError('A segmented projection needs a hash type and segment columns')
         segment_clause = 'SEGMENTED BY '
         segment_clause = segment_clause + 'MODULARHASH(' if self.modularhash == True else segment_clause
         segment_clause = segment_clause + 'HASH(' if self.modularhash == False else segment_clause
@@ -477,20 +621,12 @@ class ProjParser():
 
         return db, schema, obj
 
-    def get_col_names_only(self, full_col_name):
-        columns = []
+    def get_col_names_only(self, columns):
         new_columns = []
-
-        if ',' in full_col_name:
-            columns = full_col_name.split(',')
-        else:
-            columns = [full_col_name]
-
         for c in columns:
-            if '.' in c:
-                c_parts = c.split('.')
-                col_name = c_parts[len(c_parts) - 1].strip()
-                new_columns.append(col_name)
+            c_parts = c.split()
+            col_name = c_parts[0].rsplit('.', 1)[-1]
+            new_columns.append(' '.join([col_name] + c_parts[1:]))
         return new_columns
 
     def single_line_column_list(self, col_list):
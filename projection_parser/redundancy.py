@@ -0,0 +1,165 @@
+import argparse
+import sys
+from collections import namedtuple
+
+from projection_parser.catalog_diff import format_key, iter_models
+from projection_parser.dump_reader import DEFAULT_CHUNK_SIZE
+
+# projection / covered_by are (database, schema, basename) keys, buddies count as one
+# projection. exact is True when both have the same columns and sort order.
+RedundancyCandidate = namedtuple('RedundancyCandidate', ['table', 'projection', 'covered_by', 'exact', 'segmentation_mismatch'])
+
+SortEntry = namedtuple('SortEntry', ['key', 'columns', 'order', 'segmentation'])
+
+
+def name_key(name):
+    return name.lower() if name else ''
+
+
+def column_name(name):
+    return name_key(name.rsplit('.', 1)[-1])
+
+
+def anchor_table(projection):
+    return (name_key(projection.from_database), name_key(projection.from_schema), name_key(projection.from_table))
+
+
+def sort_entry(projection):
+    segmentation = (
+        projection.segmentation_spec,
+        projection.modularhash if projection.segmentation_spec else None,
+        tuple(column_name(c) for c in projection.segment_columns) if projection.segmentation_spec else (),
+    )
+    return SortEntry(
+        (projection.projection_database, projection.projection_schema, projection.projection_basename),
+        frozenset(column_name(c.col_name) for c in projection.select_list),
+        tuple(column_name(c) for c in projection.order_by_list),
+        segmentation,
+    )
+
+
+##########################
+## SORT ORDER TRIE      ##
+
+class SortTrieNode():
+    __slots__ = ('children', 'entries')
+
+    def __init__(self):
+        self.children = {}
+        self.entries = []
+
+
+def build_sort_trie(entries):
+    root = SortTrieNode()
+    for entry in entries:
+        node = root
+        for column in entry.order:
+            child = node.children.get(column)
+            if child is None:
+                child = node.children[column] = SortTrieNode()
+            node = child
+        node.entries.append(entry)
+    return root
+
+
+def find_covered(root):
+    # Every projection whose sort order extends the one at a node sits in that node's
+    # subtree. Walking the trie bottom up, each node hands its parent the projections of
+    # its subtree that no other projection there covers. A projection only has to be
+    # checked against those: covering is transitive, so whatever covers a covered
+    # projection covers the new one as well.
+    covered = []
+    uncovered = {}  # node id -> uncovered entries of its subtree
+    stack = [(root, False)]
+    while stack:
+        node, children_done = stack.pop()
+        if not children_done:
+            stack.append((node, True))
+            stack.extend((child, False) for child in node.children.values())
+            continue
+        candidates = []
+        for child in node.children.values():
+            candidates.extend(uncovered.pop(id(child)))
+        # Wider projections first, so that of two with the same sort order the wider
+        # one is the one kept
+        for entry in sorted(node.entries, key=lambda e: -len(e.columns)):
+            for other in candidates:
+                if entry.columns <= other.columns:
+                    covered.append((entry, other))
+                    break
+            else:
+                candidates.append(entry)
+        uncovered[id(node)] = candidates
+    return covered
+
+
+##########################
+## ANALYSIS             ##
+
+def group_by_anchor_table(projections):
+    tables = {}
+    for projection in projections:
+        # Top-K and live aggregate projections store something other than table rows
+        if projection.is_topk or projection.is_lap:
+            continue
+        entries = tables.setdefault(anchor_table(projection), {})
+        entry = sort_entry(projection)
+        entries.setdefault(entry.key, entry)  # keep one buddy
+    return tables
+
+
+def find_redundant_projections(projections):
+    candidates = []
+    for table, entries in sorted(group_by_anchor_table(projections).items()):
+        if len(entries) < 2:
+            continue
+        for entry, other in find_covered(build_sort_trie(entries.values())):
+            candidates.append(RedundancyCandidate(
+                table,
+                entry.key,
+                other.key,
+                entry.columns == other.columns and entry.order == other.order,
+                entry.segmentation != other.segmentation,
+            ))
+    return candidates
+
+
+def analyze_catalog(source, chunk_size=DEFAULT_CHUNK_SIZE, errors=None, **settings):
+    return find_redundant_projections(iter_models(source, chunk_size, errors, **settings))
+
+
+##########################
+## CLI                  ##
+
+def format_candidate(candidate):
+    line = '{0} is covered by {1}'.format(format_key(candidate.projection + (None,)), format_key(candidate.covered_by + (None,)))
+    notes = []
+    if candidate.exact:
+        notes.append('same columns and sort order')
+    if candidate.segmentation_mismatch:
+        notes.append('segmentation differs')
+    return line + (' ({0})'.format(', '.join(notes)) if notes else '')
+
+
+def main(argv=None):
+    arg_parser = argparse.ArgumentParser(
+        prog='projection-redundancy',
+        description='List projections whose columns and sort order are covered by another projection of the same table',
+    )
+    arg_parser.add_argument('dump', help='catalog dump to analyze')
+    arg_parser.add_argument('--table-name-with-column-name', action='store_true')
+    args = arg_parser.parse_args(argv)
+
+    errors = []
+    candidates = analyze_catalog(args.dump, errors=errors, table_name_with_column_name=args.table_name_with_column_name)
+    for candidate in candidates:
+        sys.stdout.write(format_candidate(candidate) + '\n')
+    for error in errors:
+        sys.stderr.write(error + '\n')
+    if errors:
+        return 2
+    return 1 if candidates else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,211 @@
+import argparse
+import hashlib
+import io
+import json
+import os
+import sys
+import time
+from collections import namedtuple
+
+from projection_parser.api import Options, parse, render
+from projection_parser.dump_reader import iter_projection_statements
+from projection_parser.projection_parser import PARSER_VERSION
+
+MANIFEST_VERSION = 1
+MANIFEST_NAME = '.projection-manifest.json'
+SOURCE_SUFFIX = '.sql'
+DEFAULT_INTERVAL = 1.0
+
+# error is the message of the last failed parse; the file is retried when its content changes
+ManifestEntry = namedtuple('ManifestEntry', ['mtime_ns', 'size', 'digest', 'error'], defaults=(None,))
+# errors are the failures of this sync, failing the stored errors of every file that still fails
+SyncResult = namedtuple('SyncResult', ['parsed', 'unchanged', 'written', 'removed', 'errors', 'failing'])
+
+
+##########################
+## MANIFEST             ##
+
+class Manifest():
+    # Records, per source file, the stat and content hash seen at the last sync. The
+    # parser version and options are part of it: a change to either re-renders everything.
+    def __init__(self, path, options):
+        self.path = path
+        self.settings = {'parser_version': PARSER_VERSION, 'options': list(options)}
+        self.entries = {}  # relative path -> ManifestEntry
+
+    def load(self):
+        try:
+            with open(self.path) as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return False
+        if data.get('version') != MANIFEST_VERSION or data.get('settings') != self.settings:
+            return False
+        self.entries = {path: ManifestEntry(*entry) for path, entry in data['entries'].items()}
+        return True
+
+    def save(self):
+        data = {
+            'version': MANIFEST_VERSION,
+            'settings': self.settings,
+            'entries': {path: list(entry) for path, entry in sorted(self.entries.items())},
+        }
+        write_atomic(self.path, json.dumps(data, indent=1))
+
+
+def write_atomic(path, text):
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        f.write(text)
+    os.replace(tmp_path, path)
+
+
+def file_digest(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+##########################
+## SYNC                 ##
+
+def iter_source_files(source_dir, output_dir=None):
+    output_dir = os.path.abspath(output_dir) if output_dir else None
+    for root, dirs, files in os.walk(source_dir):
+        dirs.sort()
+        if output_dir is not None:
+            # The output tree may live inside the source tree
+            dirs[:] = [d for d in dirs if os.path.abspath(os.path.join(root, d)) != output_dir]
+        for name in sorted(files):
+            if name.endswith(SOURCE_SUFFIX):
+                path = os.path.join(root, name)
+                yield os.path.relpath(path, source_dir), path
+
+
+def render_file(data, options):
+    # The whole file fails on the first statement that does not parse
+    statements = iter_projection_statements(io.StringIO(data.decode('utf-8')))
+    return ''.join(render(parse(statement, options), options) + '\n\n' for statement in statements)
+
+
+def write_if_changed(path, text):
+    try:
+        with open(path, encoding='utf-8') as f:
+            if f.read() == text:
+                return False
+    except OSError:
+        pass
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    write_atomic(path, text)
+    return True
+
+
+def sync_tree(source_dir, output_dir, options=None, manifest_path=None):
+    options = options or Options()
+    manifest = Manifest(manifest_path or os.path.join(output_dir, MANIFEST_NAME), options)
+    loaded = manifest.load()
+    previous = manifest.entries
+    entries = {}
+    parsed = unchanged = written = removed = 0
+    errors = []
+
+    for rel_path, path in iter_source_files(source_dir, output_dir):
+        stat = os.stat(path)
+        entry = previous.get(rel_path)
+        if entry is not None and (entry.mtime_ns, entry.size) == (stat.st_mtime_ns, stat.st_size):
+            entries[rel_path] = entry
+            unchanged += 1
+            continue
+
+        with open(path, 'rb') as f:
+            data = f.read()
+        digest = file_digest(data)
+        if entry is not None and entry.digest == digest:
+            # Touched but not edited
+            entries[rel_path] = entry._replace(mtime_ns=stat.st_mtime_ns, size=stat.st_size)
+            unchanged += 1
+            continue
+
+        parsed += 1
+        try:
+            text = render_file(data, options)
+        except Exception as e:
+            # Reported once; the last good output is kept until the file changes again
+            error = '{0}: {1}: {2}'.format(rel_path, type(e).__name__, e)
+            errors.append(error)
+            entries[rel_path] = ManifestEntry(stat.st_mtime_ns, stat.st_size, digest, error)
+            continue
+        if write_if_changed(os.path.join(output_dir, rel_path), text):
+            written += 1
+        entries[rel_path] = ManifestEntry(stat.st_mtime_ns, stat.st_size, digest)
+
+    for rel_path in set(previous) - set(entries):
+        try:
+            os.remove(os.path.join(output_dir, rel_path))
+            removed += 1
+        except FileNotFoundError:
+            pass
+
+    if entries != previous or not loaded:
+        # A poll over an unchanged tree leaves the manifest alone
+        manifest.entries = entries
+        os.makedirs(os.path.dirname(manifest.path) or '.', exist_ok=True)
+        manifest.save()
+    failing = [entries[rel_path].error for rel_path in sorted(entries) if entries[rel_path].error]
+    return SyncResult(parsed, unchanged, written, removed, errors, failing)
+
+
+def watch_tree(source_dir, output_dir, options=None, manifest_path=None, interval=DEFAULT_INTERVAL,
+               callback=None, iterations=None):
+    # Polls with sync_tree; a poll over an unchanged tree only stats the files
+    count = 0
+    while iterations is None or count < iterations:
+        result = sync_tree(source_dir, output_dir, options, manifest_path)
+        if callback is not None:
+            callback(result)
+        count += 1
+        if iterations is None or count < iterations:
+            time.sleep(interval)
+
+
+##########################
+## COMMAND LINE         ##
+
+def format_result(result):
+    return 'parsed {0}, unchanged {1}, written {2}, removed {3}, errors {4}, failing {5}'.format(
+        result.parsed, result.unchanged, result.written, result.removed, len(result.errors), len(result.failing))
+
+
+def main(argv=None):
+    arg_parser = argparse.ArgumentParser(
+        prog='projection-sync',
+        description='Write normalized copies of the .sql projection files in a tree, re-parsing only changed files',
+    )
+    arg_parser.add_argument('source_dir')
+    arg_parser.add_argument('output_dir')
+    arg_parser.add_argument('--manifest', help='manifest file (default: {0} in the output directory)'.format(MANIFEST_NAME))
+    arg_parser.add_argument('--watch', action='store_true', help='keep polling the source tree for changes')
+    arg_parser.add_argument('--interval', type=float, default=DEFAULT_INTERVAL, help='seconds between polls')
+    arg_parser.add_argument('--tab-space', type=int, default=2, metavar='N', help='indent with N spaces (default 2)')
+    arg_parser.add_argument('--no-if-not-exists', dest='if_not_exists', action='store_false')
+    arg_parser.add_argument('--table-name-with-column-name', action='store_true')
+    args = arg_parser.parse_args(argv)
+    options = Options(' ' * args.tab_space, args.table_name_with_column_name, args.if_not_exists)
+
+    def report(result):
+        # A poll only reports new failures, a single sync every file that still fails
+        for error in result.errors if args.watch else result.failing:
+            sys.stderr.write(error + '\n')
+        if result.parsed or result.removed or not args.watch:
+            sys.stderr.write(format_result(result) + '\n')
+        return result
+
+    if not args.watch:
+        return 1 if report(sync_tree(args.source_dir, args.output_dir, options, args.manifest)).failing else 0
+    try:
+        watch_tree(args.source_dir, args.output_dir, options, args.manifest, args.interval, report)
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
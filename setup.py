@@ -13,4 +13,13 @@ setup(
     author='Alec Saunders',
     author_email='alec.saunders@domo.com',
     url='https://git.empdev.domo.com/DBA/ProjectionParser',
+    packages=find_packages(exclude=('benchmarks',)),
+    entry_points={
+        'console_scripts': [
+            'projection-parser=projection_parser.cli:main',
+            'projection-diff=projection_parser.catalog_diff:main',
+            'projection-sync=projection_parser.watch:main',
+            'projection-redundancy=projection_parser.redundancy:main',
+        ],
+    },
 )
@@ -0,0 +1,127 @@
+import unittest
+
+from projection_parser import ProjParser, parse, render
+
+
+def reformat_lines(ddl):
+    return render(parse(ddl)).splitlines()
+
+
+class ParseTest(unittest.TestCase):
+    def test_segmented(self):
+        ddl = ('CREATE PROJECTION IF NOT EXISTS db.s.p (a ENCODING RLE, b ACCESSRANK 5, c) AS '
+               'SELECT t.a, t.b, t.c FROM db.s.t ORDER BY t.b, t.a SEGMENTED BY HASH(t.a, t.b) ALL NODES;')
+        self.assertEqual(reformat_lines(ddl), [
+            'CREATE PROJECTION IF NOT EXISTS db.s.p',
+            '(',
+            '  b ACCESSRANK 5,',
+            '  a ENCODING RLE,',
+            '  c',
+            ')',
+            'AS',
+            'SELECT',
+            '  b,',
+            '  a,',
+            '  c',
+            'FROM db.s.t',
+            'ORDER BY',
+            '  b,',
+            '  a',
+            'SEGMENTED BY HASH(a, b) ALL NODES;',
+        ])
+        projection = parse(ddl)
+        self.assertEqual((projection.projection_database, projection.projection_schema, projection.projection_basename), ('db', 's', 'p'))
+        self.assertIs(projection.segmentation_spec, True)
+        self.assertIs(projection.modularhash, False)
+
+    def test_unsegmented(self):
+        ddl = 'CREATE PROJECTION s.p (a, b) AS SELECT a, b FROM s.t ORDER BY b UNSEGMENTED ALL NODES;'
+        self.assertEqual(reformat_lines(ddl)[-3:], ['ORDER BY', '  b', 'UNSEGMENTED ALL NODES;'])
+        self.assertIs(parse(ddl).segmentation_spec, False)
+
+    def test_modularhash(self):
+        ddl = 'CREATE PROJECTION s.p (a, b) AS SELECT a, b FROM s.t ORDER BY a SEGMENTED BY MODULARHASH(a) ALL NODES;'
+        self.assertEqual(reformat_lines(ddl)[-1], 'SEGMENTED BY MODULARHASH(a) ALL NODES;')
+        self.assertIs(parse(ddl).modularhash, True)
+
+    def test_topk(self):
+        ddl = 'CREATE PROJECTION s.p (a, b) AS SELECT a, b FROM s.t LIMIT 3 OVER (PARTITION BY a ORDER BY b DESC);'
+        projection = parse(ddl)
+        self.assertTrue(projection.is_topk)
+        self.assertEqual((projection.topk_limit, projection.topk_partition, projection.topk_order_by), ('3', 'a', 'b DESC'))
+        self.assertEqual(reformat_lines(ddl)[-3:], ['FROM s.t', 'LIMIT 3 OVER(PARTITION BY a ORDER BY b DESC)', 'ALL NODES;'])
+
+    def test_live_aggregate(self):
+        ddl = 'CREATE PROJECTION s.p (a, total) AS SELECT a, SUM(b) AS total FROM s.t GROUP BY a;'
+        projection = parse(ddl)
+        self.assertTrue(projection.is_lap)
+        self.assertEqual(projection.select_list[1], ('b', 'SUM', 'total'))
+        self.assertEqual(reformat_lines(ddl)[-7:], ['SELECT', '  a,', '  SUM(b) AS total', 'FROM s.t', '  GROUP BY', '    a', 'ALL NODES;'])
+
+    def test_createtype_hint(self):
+        ddl = 'CREATE PROJECTION s.p /*+createtype(L)*/ (a, b) AS SELECT a, b FROM s.t ORDER BY a SEGMENTED BY HASH(a) ALL NODES;'
+        self.assertEqual(parse(ddl).create_type, 'L')
+        self.assertEqual(reformat_lines(ddl)[0], 'CREATE PROJECTION IF NOT EXISTS s.p /*+createtype(L)*/')
+
+    def test_buddy_suffix(self):
+        ddl = 'CREATE PROJECTION s.p_b1 (a, b) AS SELECT a, b FROM s.t ORDER BY a SEGMENTED BY HASH(a) ALL NODES OFFSET 1;'
+        projection = parse(ddl)
+        self.assertEqual((projection.projection_basename, projection.projection_name, projection.buddy), ('p', 'p_b1', 1))
+        self.assertEqual(projection.offset, 1)
+
+    def test_ksafe_offset(self):
+        ddl = 'CREATE PROJECTION s.p (a, b) AS SELECT a, b FROM s.t ORDER BY a SEGMENTED BY HASH(a) ALL NODES KSAFE 1 OFFSET 2;'
+        projection = parse(ddl)
+        self.assertEqual((projection.ksafe, projection.offset), (1, 2))
+        bare = parse(ddl.replace(' KSAFE 1 OFFSET 2', ' KSAFE'))
+        self.assertEqual((bare.ksafe, bare.offset), (None, None))
+
+    def test_comments(self):
+        ddl = ('CREATE PROJECTION s.p ( -- columns\n a, /* first; */ b) AS SELECT a, b FROM s.t '
+               'ORDER BY a SEGMENTED BY HASH(a) ALL NODES;')
+        projection = parse(ddl)
+        self.assertEqual(tuple(c.col_name for c in projection.projection_col_list), ('a', 'b'))
+        self.assertEqual(projection.order_by_list, ('a',))
+
+    def test_quoted_identifiers(self):
+        ddl = ('CREATE PROJECTION s.p ("a b" ENCODING RLE, c) AS SELECT "a b", c FROM s."my table" '
+               'ORDER BY "a b", c SEGMENTED BY HASH("a b") ALL NODES;')
+        projection = parse(ddl)
+        self.assertEqual(projection.projection_col_list[0], ('"a b"', 'RLE', None))
+        self.assertEqual(projection.from_table, '"my table"')
+        self.assertEqual(projection.order_by_list, ('"a b"', 'c'))
+        self.assertEqual(reformat_lines(ddl)[-1], 'SEGMENTED BY HASH("a b") ALL NODES;')
+
+
+class MissingClauseTest(unittest.TestCase):
+    def test_no_order_by_or_segmentation(self):
+        ddl = 'CREATE PROJECTION s.p (a, b) AS SELECT a, b FROM s.t;'
+        self.assertIsNone(parse(ddl).segmentation_spec)
+        self.assertEqual(reformat_lines(ddl)[-1], 'FROM s.t;')
+
+    def test_no_order_by(self):
+        ddl = 'CREATE PROJECTION s.p (a, b) AS SELECT a, b FROM s.t SEGMENTED BY HASH(a) ALL NODES;'
+        self.assertEqual(reformat_lines(ddl)[-2:], ['FROM s.t', 'SEGMENTED BY HASH(a) ALL NODES;'])
+
+    def test_no_segmentation(self):
+        ddl = 'CREATE PROJECTION s.p (a, b) AS SELECT a, b FROM s.t ORDER BY a;'
+        self.assertEqual(reformat_lines(ddl)[-3:], ['FROM s.t', 'ORDER BY', '  a;'])
+
+    def test_segmentation_without_hash(self):
+        with self.assertRaises(ValueError):
+            parse('CREATE PROJECTION s.p (a, b) AS SELECT a, b FROM s.t ORDER BY a SEGMENTED BY a ALL NODES;')
+
+    def test_segmented_without_hash_columns(self):
+        projection = parse('CREATE PROJECTION s.p (a, b) AS SELECT a, b FROM s.t ORDER BY a UNSEGMENTED ALL NODES;')
+        with self.assertRaises(ValueError):
+            render(projection._replace(segmentation_spec=True))
+
+    def test_parser_instance_matches_parse(self):
+        ddl = 'CREATE PROJECTION s.p (a, b) AS SELECT a, b FROM s.t ORDER BY a SEGMENTED BY HASH(a) ALL NODES;'
+        proj = ProjParser()
+        proj.raw_proj = ddl
+        self.assertEqual(proj.parse_projection(), parse(ddl))
+
+
+if __name__ == '__main__':
+    unittest.main()
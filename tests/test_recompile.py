@@ -0,0 +1,27 @@
+import unittest
+
+from projection_parser import ProjParser, parse, render
+
+SEGMENTED = 'CREATE PROJECTION s.a (x, y) AS SELECT x, y FROM s.t ORDER BY x SEGMENTED BY HASH(x) ALL NODES;'
+TOPK = 'CREATE PROJECTION s.b (x, y) AS SELECT x, y FROM s.t LIMIT 1 OVER (PARTITION BY x ORDER BY y);'
+UNSEGMENTED = 'CREATE PROJECTION s.c (x, y) AS SELECT x, y FROM s.t ORDER BY x UNSEGMENTED ALL NODES;'
+
+
+class RecompileReuseTest(unittest.TestCase):
+    def test_reused_parser_matches_fresh_render(self):
+        # A Top-K projection skips the segment clause; the next projection must not
+        # get the segment clause cached for the one before it
+        proj = ProjParser()
+        for ddl in (SEGMENTED, TOPK, UNSEGMENTED, SEGMENTED):
+            projection = parse(ddl)
+            self.assertEqual(proj.recompile_projection(projection), render(projection))
+
+    def test_unsegmented_after_topk(self):
+        proj = ProjParser()
+        for ddl in (SEGMENTED, TOPK):
+            proj.recompile_projection(parse(ddl))
+        self.assertTrue(proj.recompile_projection(parse(UNSEGMENTED)).endswith('UNSEGMENTED ALL NODES;'))
+
+
+if __name__ == '__main__':
+    unittest.main()